@@ -1,9 +1,22 @@
 import uvicorn
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import PlainTextResponse
 from src.config.settings import get_settings
 from src.logger.logger import get_logger
 from src.routers import router_generator 
+from src.routers import router_metrics
+from src.services.service_jobs import job_queue
+from src.services.service_executor import shutdown_executor, run_blocking
+from src.services.service_crewai.utils import load_report_template
+from src.services.service_pdf import start_pdf_backend, stop_pdf_backend
+from src.services.service_report import cleanup_spill_dir
+from src.services.service_resources import resources
+from src.services.service_metrics import RequestIdMiddleware, run_metrics_publisher
+from src.services.service_state import state_backend
 from fastapi.middleware.cors import CORSMiddleware
 
 settings = get_settings()
@@ -20,8 +33,49 @@ ascii_art ="""
                                                                                                                     
 
 """
+
+async def warm_up():
+    """Load the LLM stack and the PDF engine ahead of the first report."""
+    try:
+        await run_blocking(resources.warm_up)
+        await run_blocking(start_pdf_backend)
+    except Exception as e:
+        logger.error(f"Error occured during warm-up : {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    load_report_template()
+    cleanup_spill_dir(settings.JOB_RESULT_TTL_SECONDS)
+    resources.start()
+    await job_queue.start()
+    # Other workers sum this one's metrics when they answer /metrics
+    metrics_task = (
+        asyncio.create_task(run_metrics_publisher(state_backend))
+        if settings.METRICS_ENABLED and state_backend.shared else None
+    )
+    # Heavy modules load in the background (or on the first report), not before the app answers
+    warm_up_task = asyncio.create_task(warm_up()) if settings.STARTUP_WARMUP else None
+    logger.info(
+        f"Startup completed in {(time.perf_counter() - start) * 1000:.1f} ms "
+        f"(pid {os.getpid()}, {state_backend.name} state)"
+    )
+    yield
+    start = time.perf_counter()
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    if metrics_task is not None:
+        metrics_task.cancel()
+    await job_queue.stop()
+    stop_pdf_backend()
+    await resources.aclose()
+    shutdown_executor()
+    state_backend.close()
+    logger.info(f"Shutdown completed in {(time.perf_counter() - start) * 1000:.1f} ms")
+
 app = FastAPI(
     title="AI Report Generator API App SMARTSHIELD",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -32,11 +86,14 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allows all headers
 )
+# Request ids on log lines and the HTTP latency histogram
+app.add_middleware(RequestIdMiddleware)
 
 logger.info(f"Starting App : \n {ascii_art}")
 
 logger.info("App Ready")
 app.include_router(router_generator.router)
+app.include_router(router_metrics.router)
 @app.get("/", response_class=PlainTextResponse)
 async def root():
     return ascii_art
@@ -45,11 +102,12 @@ async def root():
 
 if __name__ == "__main__":
     try : 
+        # Several workers need the import string: each process imports the app itself
         uvicorn.run(
-            app,
-            port=8002,
-            host="0.0.0.0",
-
+            "app:app",
+            port=settings.PORT,
+            host=settings.HOST,
+            workers=settings.WORKERS,
         )
     except KeyboardInterrupt as ki : 
         logger.info("Turning Server Off ...")
@@ -2,7 +2,7 @@ import os
 import json
 from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import Dict, Literal, Optional
 
 class Settings(BaseSettings):
     """
@@ -11,6 +11,122 @@ class Settings(BaseSettings):
     """
     GROQ_API_KEY : str 
     MODEL : str 
+    # Groq-compatible API base URL, e.g. a local mock server for benchmarks
+    GROQ_BASE_URL : Optional[str] = None
+
+    # Load crewai/langchain/groq, prebuild agents and start the PDF backend in
+    # the background at startup instead of on the first report
+    STARTUP_WARMUP : bool = False
+
+    # Server: WORKERS uvicorn processes, each with its own event loop, job
+    # queue and PDF backend
+    HOST : str = "0.0.0.0"
+    PORT : int = 8002
+    WORKERS : int = 1
+
+    # State shared by the workers (job records, run records, LLM rate limits):
+    # "memory" is per process, "sqlite" a database file every worker opens.
+    # Unset, it is "sqlite" when WORKERS > 1
+    STATE_BACKEND : Optional[Literal["memory", "sqlite"]] = None
+    STATE_SQLITE_PATH : str = ".cache/state.sqlite3"
+
+    # Shared HTTP clients (keep-alive pools) and prebuilt agents
+    HTTP_MAX_CONNECTIONS : int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS : int = 20
+    HTTP_TIMEOUT_SECONDS : float = 120.0
+    AGENT_POOL_SIZE : int = 8
+
+    # LLM rate limits, per model: {"model": {"rpm": 30, "tpm": 5000}}
+    LLM_RATE_LIMITS : Dict[str, Dict[str, int]] = {}
+    LLM_DEFAULT_RPM : int = 30
+    LLM_DEFAULT_TPM : int = 30000
+    LLM_COMPLETION_TOKENS_ESTIMATE : int = 512
+    LLM_MAX_QUEUE_WAIT_SECONDS : float = 30.0
+    LLM_MAX_RETRIES : int = 4
+    LLM_RETRY_BASE_SECONDS : float = 1.0
+
+    # Requests are cancelled once past their deadline (`deadline_seconds` in
+    # the body, else this default) or when the client disconnects, checked
+    # every DISCONNECT_POLL_SECONDS
+    REQUEST_DEADLINE_SECONDS : float = 300.0
+    DISCONNECT_POLL_SECONDS : float = 0.5
+
+    # Background report jobs
+    JOB_QUEUE_MAXSIZE : int = 100
+    JOB_WORKERS : int = 4
+    JOB_RESULT_TTL_SECONDS : int = 3600
+    # Finished results held in memory per worker, past it they are spilled to
+    # REPORT_SPILL_DIR; expired jobs are pruned every JOB_PRUNE_INTERVAL_SECONDS
+    JOB_RESULT_MEMORY_BYTES : int = 256 * 1024 * 1024
+    JOB_PRUNE_INTERVAL_SECONDS : float = 60.0
+
+    # Threads used for the blocking stages (CrewAI, PDF rendering)
+    BLOCKING_POOL_WORKERS : int = 8
+
+    # Report cache (in-memory LRU in front of an on-disk store)
+    REPORT_CACHE_ENABLED : bool = True
+    REPORT_CACHE_DIR : str = ".cache/reports"
+    REPORT_CACHE_MEMORY_ENTRIES : int = 256
+    REPORT_CACHE_MEMORY_BYTES : int = 64 * 1024 * 1024
+    REPORT_CACHE_MAX_BYTES : int = 512 * 1024 * 1024
+    REPORT_CACHE_TTL_SECONDS : int = 24 * 3600
+    REPORT_CACHE_FLOAT_DIGITS : int = 6
+
+    # Stage artifact cache: each agent task output, keyed by its prompt and
+    # its upstream stages, is reused when a report is re-run
+    STAGE_CACHE_ENABLED : bool = True
+    STAGE_CACHE_DIR : str = ".cache/stages"
+    STAGE_CACHE_MAX_BYTES : int = 64 * 1024 * 1024
+    STAGE_CACHE_TTL_SECONDS : int = 7 * 24 * 3600
+    STAGE_RUNS_MAX_ENTRIES : int = 1024
+
+    # Logging: "console" is colored text, "json" one JSON object per line.
+    # With the queue enabled, records are formatted and written by a
+    # background thread instead of the caller
+    LOG_LEVEL : Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "DEBUG"
+    LOG_FORMAT : Literal["console", "json"] = "console"
+    LOG_QUEUE_ENABLED : bool = False
+    LOG_MAX_PAYLOAD_CHARS : int = 1000
+
+    # Per-stage timing spans and Prometheus metrics on /metrics. With a shared
+    # state backend every worker publishes its metrics there every
+    # METRICS_PUBLISH_SECONDS, and /metrics sums the workers
+    METRICS_ENABLED : bool = True
+    METRICS_PUBLISH_SECONDS : float = 5.0
+
+    # Prompt compaction: threat_data is trimmed, rounded and relabelled before
+    # it reaches the agents, with the most anomalous features listed first
+    PROMPT_COMPACTION_ENABLED : bool = True
+    PROMPT_TOP_DEVIATIONS : int = 3
+
+    # Write the mitigation plan from the threat data, in parallel with the
+    # analysis instead of after it: one LLM call less on the critical path,
+    # but the plan no longer sees the analysis
+    PARALLEL_MITIGATION : bool = False
+
+    # HTML rendering: "template" renders locally, "llm" asks the model for the page
+    HTML_RENDERER : Literal["template", "llm"] = "template"
+
+    # PDF rendering: "pool" keeps WeasyPrint loaded in worker processes,
+    # "wkhtmltopdf" spawns the binary per report, "fpdf" is the pure-Python fallback
+    PDF_BACKEND : Literal["pool", "wkhtmltopdf", "fpdf"] = "pool"
+    PDF_POOL_WORKERS : int = 2
+    WKHTMLTOPDF_PATH : Optional[str] = None
+
+    # Reports are kept in memory; larger ones are spilled to REPORT_SPILL_DIR
+    REPORT_SPILL_ENABLED : bool = True
+    REPORT_SPILL_THRESHOLD_BYTES : int = 8 * 1024 * 1024
+    REPORT_SPILL_DIR : str = ".cache/spill"
+
+    # Batch reports
+    BATCH_MAX_ROWS : int = 100000
+
+    # Bulk CSV/NDJSON ingestion: flows are read INGEST_CHUNK_ROWS at a time,
+    # scored and clustered; the INGEST_TOP_K clusters get a report
+    INGEST_CHUNK_ROWS : int = 20000
+    INGEST_TOP_K : int = 5
+    INGEST_MAX_CLUSTERS : int = 10000
+
     class Config:
         env_file = ".env"
         extra = "ignore"
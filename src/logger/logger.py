@@ -1,29 +1,117 @@
+import atexit
 import functools
+import json
 import logging
+import queue
+import reprlib
 import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from uvicorn.logging import ColourizedFormatter
-from typing import Any, Callable
+from typing import Any, Callable, Optional
+from src.config.settings import get_settings
+
+settings = get_settings()
+
+# Id of the HTTP request (or job) being served, set by the request id
+# middleware and shown on every log line emitted while serving it
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
 
 # Custom colorized formatter to apply colors specifically to log levels
 class CustomColourizedFormatter(ColourizedFormatter):
+    # Color mappings for the different log levels
+    LEVEL_COLOR_MAP = {
+        "DEBUG": "\033[34m",    # Blue
+        "INFO": "\033[32m",     # Green
+        "WARNING": "\033[33m",  # Yellow
+        "ERROR": "\033[31m",    # Red
+        "CRITICAL": "\033[41m", # Red background
+    }
+    RESET = "\033[0m"
+
+    def format(self, record: logging.LogRecord) -> str:
+        # Color the level name for this output only, other handlers get the record unchanged
+        levelname = record.levelname
+        record.levelname = f"{self.LEVEL_COLOR_MAP.get(levelname, '')}{levelname}{self.RESET}"
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers.
+
+    Structured fields passed as `extra={"fields": {...}}` are added to the object.
+    """
+
     def format(self, record: logging.LogRecord) -> str:
-        # Define color mappings for different log levels
-        level_color_map = {
-            "DEBUG": "\033[34m",    # Blue
-            "INFO": "\033[32m",     # Green
-            "WARNING": "\033[33m",  # Yellow
-            "ERROR": "\033[31m",    # Red
-            "CRITICAL": "\033[41m", # Red background
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
         }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The stock `QueueHandler.prepare` formats the record on the calling
+    thread; here the caller only runs the filters (the request id is read
+    there) and enqueues the record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
-        # Reset color
-        reset = "\033[0m"
+_queue_handler: Optional[DeferredQueueHandler] = None
+_queue_listener: Optional[QueueListener] = None
 
-        # Apply color to the log level name
-        record.levelname = f"{level_color_map.get(record.levelname, '')}{record.levelname}{reset}"
+def _build_stream_handler() -> logging.Handler:
+    ch = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        ch.setFormatter(JsonFormatter())
+    else:
+        # Create a custom formatter with colored log levels
+        ch.setFormatter(CustomColourizedFormatter(
+            "{asctime} | {levelname:<8} | {request_id} | {message}",
+            style="{",
+            datefmt="%Y-%m-%d %H:%M:%S",
+            use_colors=True
+        ))
+    return ch
 
-        # Format the log message using the parent class's format method
-        return super().format(record)
+def _get_queue_handler() -> DeferredQueueHandler:
+    """Process-wide queue handler; one listener thread formats and writes every record."""
+    global _queue_handler, _queue_listener
+    if _queue_handler is None:
+        records = queue.SimpleQueue()
+        _queue_handler = DeferredQueueHandler(records)
+        _queue_handler.addFilter(RequestIdFilter())
+        _queue_listener = QueueListener(records, _build_stream_handler())
+        _queue_listener.start()
+        atexit.register(stop_logging)
+    return _queue_handler
+
+def stop_logging():
+    """Flush the queued records and stop the listener thread (queue mode only)."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
 
 def get_logger(name: str) -> logging.Logger:
     """Creates a logger object
@@ -32,53 +120,67 @@ def get_logger(name: str) -> logging.Logger:
         name (str): name given to the logger
 
     Returns:
-        logging.Logger: logger object to be used for logging 
+        logging.Logger: logger object to be used for logging
     """
     # Create logger
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(settings.LOG_LEVEL)
 
     # Prevent adding multiple handlers if already exists
     if not logger.hasHandlers():
-        # Create console handler and set level to debug
-        ch = logging.StreamHandler(sys.stdout)
-        ch.setLevel(logging.DEBUG)
+        if settings.LOG_QUEUE_ENABLED:
+            # Non-blocking: the caller only enqueues the record
+            logger.addHandler(_get_queue_handler())
+        else:
+            ch = _build_stream_handler()
+            ch.addFilter(RequestIdFilter())
+            logger.addHandler(ch)
 
-        # Create a custom formatter with colored log levels
-        formatter = CustomColourizedFormatter(
-            "{asctime} | {levelname:<8} | {message}",
-            style="{",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            use_colors=True
-        )
+    return logger
 
-        # Add formatter to the handler
-        ch.setFormatter(formatter)
+class _Payload:
+    """Lazily rendered, size-capped repr of a logged argument or result."""
 
-        # Add handler to the logger
-        logger.addHandler(ch)
+    def __init__(self, value: Any, max_chars: int):
+        self.value = value
+        self.max_chars = max_chars
 
-    return logger
+    def __str__(self) -> str:
+        # reprlib truncates long strings and containers before rendering them
+        limited = reprlib.Repr()
+        limited.maxstring = limited.maxother = self.max_chars
+        text = limited.repr(self.value)
+        if len(text) > self.max_chars:
+            text = f"{text[:self.max_chars]}... ({len(text)} chars)"
+        return text
 
 # Logger decorator implementation
-def log_function_call(logger: logging.Logger) -> Callable:
+def log_function_call(logger: logging.Logger, max_chars: Optional[int] = None) -> Callable:
     """A decorator that logs the function calls and results.
 
     Args:
         logger (logging.Logger): The logger instance to use for logging.
-    
+        max_chars (int, optional): Cap on each logged payload, defaults to
+            `LOG_MAX_PAYLOAD_CHARS`.
+
     Returns:
         Callable: A wrapper function that logs the execution details.
     """
+    max_chars = max_chars or settings.LOG_MAX_PAYLOAD_CHARS
+
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            # Log the function call with arguments
-            logger.debug(f"Calling {func.__name__} with args: {args} and kwargs: {kwargs}")
+            if not logger.isEnabledFor(logging.DEBUG):
+                return func(*args, **kwargs)
+            # Log the function call with arguments, rendered only if the record is emitted
+            logger.debug(
+                "Calling %s with args: %s and kwargs: %s",
+                func.__name__, _Payload(args, max_chars), _Payload(kwargs, max_chars),
+            )
             result = func(*args, **kwargs)
             # Log the function result
-            logger.debug(f"{func.__name__} returned {result}")
+            logger.debug("%s returned %s", func.__name__, _Payload(result, max_chars))
             return result
         return wrapper
     return decorator
-
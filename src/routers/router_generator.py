@@ -1,42 +1,282 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
 from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Literal, Optional
 from src.logger.logger import get_logger
 from src.config.settings import get_settings
-from src.schemas.schema_generator import GenerateReportRequest
-from src.services.service_generator import agenerate_report
+from src.schemas.schema_generator import GenerateReportRequest, ReportJobResponse
+from src.services.service_generator import agenerate_report, astream_report
+from src.services.service_jobs import job_queue, JobQueueFullError
+from src.services.service_cache import get_report_cache
+from src.services.service_singleflight import report_flights
+from src.services.service_artifacts import get_stage_cache, stage_runs
+from src.services.service_batch import parse_rows, agenerate_batch_report, agenerate_group_reports
+from src.services.service_ingest import detect_format, triage_flows
+from src.services.service_executor import run_blocking
+from src.services.service_formats import OUTPUT_FORMATS, negotiate_format
+from src.services.service_ratelimit import RateLimitExceeded
+from src.services.service_deadline import Deadline, RequestAbandoned
 import os
-import io
+import json
+import math
 
 settings = get_settings()
 logger = get_logger(__file__)
 
 router = APIRouter(prefix="/generator")
 
+
+def _rate_limited(e: RateLimitExceeded) -> HTTPException:
+    logger.warning("Shedding report request : %s", e)
+    return HTTPException(
+        status_code=503,
+        detail="LLM provider is at capacity, retry later",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def _deadline(request: Request, deadline_seconds: Optional[float] = None) -> Deadline:
+    """The request's work is cancelled past its deadline or once its client is gone."""
+    return Deadline(deadline_seconds or settings.REQUEST_DEADLINE_SECONDS, request.is_disconnected)
+
+
+def _abandoned(e: RequestAbandoned) -> HTTPException:
+    if e.reason == "deadline":
+        return HTTPException(status_code=504, detail="Report deadline exceeded")
+    # Nobody reads it; 499 is nginx's "client closed request", for the access logs
+    return HTTPException(status_code=499, detail="Client disconnected")
+
 @router.post(path="/generate-report")
-async def generate_report(generate_report_request: GenerateReportRequest):
+async def generate_report(
+    generate_report_request: GenerateReportRequest,
+    request: Request,
+    output_format: Optional[Literal["markdown", "json", "html", "pdf"]] = Query(default=None, alias="format"),
+):
+    """The report as `?format=` or, without it, the best format of the
+    `Accept` header (PDF by default). Markdown and JSON skip the HTML and PDF
+    stages, HTML skips the PDF render. Past `deadline_seconds` the generation
+    is cancelled and 504 returned; it is also cancelled if the client leaves."""
+    output_format = negotiate_format(request.headers.get("accept"), output_format)
+    if output_format is None:
+        raise HTTPException(
+            status_code=406,
+            detail=f"Supported types: {', '.join(media_type for media_type, _ in OUTPUT_FORMATS.values())}",
+        )
     try:
         threat = generate_report_request.threat
         threat_data = generate_report_request.threat_data
 
-        report_pdf_file_path = await agenerate_report(threat, threat_data)
-        if report_pdf_file_path is None:
-            logger.error("Report generation failed, no path returned.")
+        report = await _deadline(request, generate_report_request.deadline_seconds).run(agenerate_report(
+            threat, threat_data,
+            html_renderer=generate_report_request.html_renderer,
+            output_format=output_format,
+        ))
+        if report is None:
+            logger.error("Report generation failed, no report returned.")
             raise HTTPException(status_code=500, detail="Failed to generate report")
-        if not os.path.exists(report_pdf_file_path):
-            logger.error(f"Report PDF file not found at path: {report_pdf_file_path}")
-            raise HTTPException(status_code=404, detail="Report not found")
-
-        with open(report_pdf_file_path, "rb") as report_file:
-            pdf_content = io.BytesIO(report_file.read())
-
-        # Return the PDF content as a StreamingResponse
-        pdf_content.seek(0)
-        return StreamingResponse(
-            pdf_content,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=report.pdf"}
-        )
+
+        # Streamed from memory, or straight from disk for cached and spilled reports
+        return report.to_response(OUTPUT_FORMATS[output_format][1])
     
+    except HTTPException:
+        raise
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except RequestAbandoned as e:
+        raise _abandoned(e)
     except Exception as e:
         logger.error(f"Critical Error occurred in router_generator.generate_report: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while generating the report")
+
+
+@router.post(path="/generate-report/batch")
+async def generate_batch_report(
+    request: Request,
+    output: Literal["consolidated", "per_group"] = "consolidated",
+):
+    """Accepts a JSON array or NDJSON body of `GenerateReportRequest` rows."""
+    try:
+        rows = await run_blocking(parse_rows, await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch body: {e}")
+    if not rows:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+
+    try:
+        result = await _deadline(request).run(agenerate_batch_report(rows, output))
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except RequestAbandoned as e:
+        raise _abandoned(e)
+    except Exception as e:
+        logger.error(f"Critical Error occurred in router_generator.generate_batch_report: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while generating the batch report")
+    if result is None:
+        raise HTTPException(status_code=500, detail="Failed to generate batch report")
+
+    return result.to_response("reports.zip" if output == "per_group" else "report.pdf")
+
+
+@router.post(path="/generate-report/ingest")
+async def ingest_flows(
+    request: Request,
+    file: UploadFile = File(...),
+    output: Literal["consolidated", "per_group", "triage"] = "consolidated",
+    top_k: int = Query(default=settings.INGEST_TOP_K, ge=1, le=50),
+    threat: str = "Unknown",
+    file_format: Optional[Literal["csv", "ndjson"]] = Query(default=None, alias="format"),
+):
+    """Upload a CSV or NDJSON export of flows; the file is read in chunks,
+    scored and clustered, and only the `top_k` most anomalous clusters get a
+    report. `?output=triage` returns the ranked clusters without calling the LLM."""
+    file_format = file_format or detect_format(file.filename, file.content_type)
+    if file_format is None:
+        raise HTTPException(status_code=422, detail="Unknown file format, pass ?format=csv or ?format=ndjson")
+    try:
+        triage = await run_blocking(triage_flows, file.file, file_format, top_k, threat)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid flow file: {e}")
+    finally:
+        await file.close()
+
+    if output == "triage":
+        return triage.to_dict()
+    if not triage.clusters:
+        raise HTTPException(status_code=422, detail="No anomalous flows to report")
+
+    try:
+        result = await _deadline(request).run(agenerate_group_reports(
+            {cluster.name: (cluster.threat, cluster.threat_data) for cluster in triage.clusters},
+            output,
+        ))
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except RequestAbandoned as e:
+        raise _abandoned(e)
+    except Exception as e:
+        logger.error(f"Critical Error occurred in router_generator.ingest_flows: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while generating the reports")
+    if result is None:
+        raise HTTPException(status_code=500, detail="Failed to generate reports")
+
+    return result.to_response("reports.zip" if output == "per_group" else "report.pdf")
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post(path="/generate-report/stream")
+async def stream_report(generate_report_request: GenerateReportRequest, request: Request):
+    """Server-Sent Events: one `stage` event per agent, `token` events for the
+    HTML conversion, then `done` with the download link (or `error`, also sent
+    when `deadline_seconds` pass). The pipeline stops if the client leaves."""
+    threat = generate_report_request.threat
+    threat_data = generate_report_request.threat_data
+    deadline = _deadline(request, generate_report_request.deadline_seconds)
+
+    async def event_stream():
+        try:
+            async for event, data in deadline.iterate(astream_report(
+                threat, threat_data, generate_report_request.html_renderer
+            )):
+                if event == "report":
+                    job = await job_queue.add_completed(threat, threat_data, data["report"])
+                    yield _sse("done", {
+                        "job_id": job.id,
+                        "cached": data["cached"],
+                        "stages": data["run"]["stages"],
+                        "pdf_url": str(request.url_for("get_report_job_pdf", job_id=job.id)),
+                    })
+                else:
+                    yield _sse(event, data)
+        except RateLimitExceeded as e:
+            logger.warning("Shedding report stream : %s", e)
+            yield _sse("error", {
+                "detail": "LLM provider is at capacity, retry later",
+                "retry_after": math.ceil(e.retry_after),
+            })
+        except RequestAbandoned as e:
+            if e.reason == "deadline":
+                yield _sse("error", {"detail": "Report deadline exceeded"})
+        except Exception as e:
+            logger.error(f"Critical Error occurred in router_generator.stream_report: {e}")
+            yield _sse("error", {"detail": "An error occurred while generating the report"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _job_response(request: Request, job) -> ReportJobResponse:
+    return ReportJobResponse(
+        **job.to_dict(),
+        status_url=str(request.url_for("get_report_job", job_id=job.id)),
+        pdf_url=str(request.url_for("get_report_job_pdf", job_id=job.id)),
+    )
+
+
+@router.post(path="/reports", status_code=202, response_model=ReportJobResponse)
+async def submit_report_job(generate_report_request: GenerateReportRequest, request: Request):
+    try:
+        job = await job_queue.submit(
+            generate_report_request.threat,
+            generate_report_request.threat_data,
+            deadline_seconds=generate_report_request.deadline_seconds,
+            html_renderer=generate_report_request.html_renderer,
+        )
+    except JobQueueFullError as e:
+        logger.warning("Rejecting report job : %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="Report queue is full, retry later",
+            headers={"Retry-After": "30"},
+        )
+    return _job_response(request, job)
+
+
+@router.get(path="/reports/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(job_id: str, request: Request):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return _job_response(request, job)
+
+
+@router.get(path="/reports/{job_id}/pdf")
+async def get_report_job_pdf(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    # A job still pending, or failed (shed, past its deadline or errored), has no PDF
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail={"status": job.status, "error": job.error})
+    if job.result.path is not None and not os.path.exists(job.result.path):
+        logger.error(f"Report PDF file not found at path: {job.result.path}")
+        raise HTTPException(status_code=404, detail="Report not found")
+    # The job keeps its report until it is pruned, it may be downloaded again
+    return job.result.to_response("report.pdf", cleanup=False)
+
+
+@router.get(path="/runs/{request_id}")
+async def get_report_run(request_id: str):
+    """Which stages of each report served to `request_id` were reused, generated or skipped."""
+    runs = await stage_runs.get(request_id)
+    if runs is None:
+        raise HTTPException(status_code=404, detail="Unknown request id")
+    return {"request_id": request_id, "reports": runs}
+
+
+@router.get(path="/cache/stats")
+async def get_cache_stats():
+    return {
+        "enabled": settings.REPORT_CACHE_ENABLED,
+        **(get_report_cache().stats() if settings.REPORT_CACHE_ENABLED else {}),
+        "stages": {
+            "enabled": settings.STAGE_CACHE_ENABLED,
+            **(get_stage_cache().stats() if settings.STAGE_CACHE_ENABLED else {}),
+        },
+        "singleflight": report_flights.stats(),
+    }
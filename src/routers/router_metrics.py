@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from src.config.settings import get_settings
+from src.services.service_metrics import arender_metrics
+from src.services.service_state import state_backend
+
+settings = get_settings()
+
+router = APIRouter()
+
+
+@router.get(path="/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint (text exposition format), summed over all workers."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(await arender_metrics(state_backend), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,11 +1,30 @@
 from pydantic import BaseModel , Field
 from src.logger.logger import get_logger
 from fastapi import UploadFile
-from typing import Dict , Any 
+from typing import Dict , Any , Optional , Literal
 
 
 
 class GenerateReportRequest(BaseModel) : 
     threat : str = Field(default = "Safe" )
     threat_data : Dict[str , Any] 
+    # Overrides settings.HTML_RENDERER for this request
+    html_renderer : Optional[Literal["template", "llm"]] = None
+    # Seconds the client will wait for the report; settings.REQUEST_DEADLINE_SECONDS
+    # if unset. Background jobs (/reports) only have a deadline when it is given
+    deadline_seconds : Optional[float] = Field(default=None, gt=0)
     
+
+
+class ReportJobResponse(BaseModel) : 
+    job_id : str
+    threat : str
+    status : str
+    created_at : float
+    started_at : Optional[float] = None
+    finished_at : Optional[float] = None
+    deadline_at : Optional[float] = None
+    error : Optional[str] = None
+    request_id : str
+    status_url : str
+    pdf_url : str
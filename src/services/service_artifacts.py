@@ -0,0 +1,147 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_cache import ReportCache
+from src.services.service_crewai.tasks import PROMPT_VERSION
+from src.services.service_dag import TaskGraph
+from src.services.service_state import StateBackend, state_backend
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+RUNS_NAMESPACE = "runs"
+
+
+def stage_artifact_keys(graph: TaskGraph) -> Dict[str, str]:
+    """Content address of every stage output in an (acyclic) task graph.
+
+    A stage's key hashes what its LLM call sees (task prompt, agent, model,
+    prompt version) and the keys of the stages it depends on, so a key only
+    matches when the stage and everything upstream of it would be asked the
+    same thing. The render options are not part of it: changing the output
+    format reuses every stage.
+    """
+    keys: Dict[str, str] = {}
+
+    def key_of(name: str) -> str:
+        if name not in keys:
+            task, deps = graph[name]
+            payload = {
+                "stage": name,
+                "description": task.description,
+                "expected_output": task.expected_output,
+                "agent": [getattr(task.agent, attr, None) for attr in ("role", "goal", "backstory")],
+                "model": settings.MODEL,
+                "prompt_version": PROMPT_VERSION,
+                "upstream": [key_of(dep) for dep in deps],
+            }
+            encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+            keys[name] = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        return keys[name]
+
+    for name in graph:
+        key_of(name)
+    return keys
+
+
+def load_stage_artifacts(keys: Dict[str, str]) -> Dict[str, str]:
+    """Cached outputs of the stages that have one.
+
+    Blocking (file I/O), call through `run_blocking` from async code.
+    """
+    artifacts = {}
+    for name, key in keys.items():
+        artifact = get_stage_cache().get(key)
+        if artifact is not None:
+            artifacts[name] = artifact.read().decode("utf-8")
+    return artifacts
+
+
+def prune_cached(graph: TaskGraph, output: str, cached: Set[str]) -> TaskGraph:
+    """Drop the stages the output no longer needs.
+
+    Cached stages become leaves (their output is known, so their own
+    dependencies are not run for them); a stage is kept only if the output
+    reaches it through stages that still have to run.
+    """
+    needed = {}
+    stack = [output]
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        task, deps = graph[name]
+        needed[name] = (task, [] if name in cached else deps)
+        if name not in cached:
+            stack.extend(deps)
+    return {name: needed[name] for name in graph if name in needed}
+
+
+class StageRuns:
+    """How recent reports were produced, by request id: which stages were
+    reused from the stage cache, generated, or skipped.
+
+    A request can be served several reports (a batch or ingest makes one per
+    group), so each request keeps one run per report key.
+
+    The runs of the latest `max_entries` requests are kept in memory; with a
+    shared state backend they are also published (for `ttl` seconds) so any
+    worker can answer for them.
+    """
+
+    def __init__(self, max_entries: int, backend: StateBackend, ttl: int):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.ttl = ttl
+        # request id -> report key -> run
+        self._runs: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def record(self, request_id: str, report_key: str, run: Dict[str, Any]):
+        with self._lock:
+            self._runs.setdefault(request_id, {})[report_key] = run
+            self._runs.move_to_end(request_id)
+            while len(self._runs) > self.max_entries:
+                self._runs.popitem(last=False)
+        if self.backend.shared:
+            await self.backend.aupdate(
+                RUNS_NAMESPACE, request_id, lambda runs: ({**(runs or {}), report_key: run}, None), ttl=self.ttl
+            )
+
+    async def get(self, request_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Runs of the reports served to `request_id`, in the order they finished."""
+        with self._lock:
+            runs = dict(self._runs.get(request_id) or {})
+        if not runs and self.backend.shared:
+            runs = await self.backend.aget(RUNS_NAMESPACE, request_id)
+        if not runs:
+            return None
+        return [{"report_key": report_key, **run} for report_key, run in runs.items()]
+
+
+_stage_cache: Optional[ReportCache] = None
+_stage_cache_lock = threading.Lock()
+
+
+def get_stage_cache() -> ReportCache:
+    """Return the process-wide stage output cache, created on first use; only
+    called when `settings.STAGE_CACHE_ENABLED`."""
+    global _stage_cache
+    with _stage_cache_lock:
+        if _stage_cache is None:
+            _stage_cache = ReportCache(
+                directory=settings.STAGE_CACHE_DIR,
+                memory_entries=settings.REPORT_CACHE_MEMORY_ENTRIES,
+                memory_bytes=settings.REPORT_CACHE_MEMORY_BYTES,
+                max_bytes=settings.STAGE_CACHE_MAX_BYTES,
+                ttl_seconds=settings.STAGE_CACHE_TTL_SECONDS,
+                suffix=".md",
+                media_type="text/markdown",
+            )
+    return _stage_cache
+
+stage_runs = StageRuns(settings.STAGE_RUNS_MAX_ENTRIES, state_backend, ttl=settings.JOB_RESULT_TTL_SECONDS)
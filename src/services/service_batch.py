@@ -0,0 +1,195 @@
+import asyncio
+import io
+import json
+import zipfile
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.schemas.schema_generator import GenerateReportRequest
+from src.services.service_executor import run_blocking
+from src.services.service_generator import agenerate_report
+from src.services.service_report import Report, make_report
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+# Categorical values listed per feature in an aggregated group
+TOP_CATEGORIES = 5
+
+
+def parse_rows(body: bytes, content_type: str = "") -> List[GenerateReportRequest]:
+    """Parse a batch body, either a JSON array or NDJSON (one row per line).
+
+    Raises:
+        ValueError: when the body is neither, or a row fails validation
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+    if "ndjson" in content_type or not text.startswith("["):
+        raw_rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        raw_rows = json.loads(text)
+    if len(raw_rows) > settings.BATCH_MAX_ROWS:
+        raise ValueError(f"Batch has {len(raw_rows)} rows, the limit is {settings.BATCH_MAX_ROWS}")
+    return [GenerateReportRequest(**row) for row in raw_rows]
+
+
+def group_rows(rows: List[GenerateReportRequest]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group the threat data of each row by its threat label."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.threat.strip()].append(row.threat_data)
+    return dict(groups)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def aggregate_group(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize the flows of one threat group into a single threat_data dict.
+
+    Numeric features become min/max/mean statistics, other features the
+    counts of their most frequent values.
+    """
+    # Imported on first use, batch reports are not on the startup path
+    import numpy as np
+
+    features = {}
+    for row in rows:
+        for key in row:
+            features.setdefault(key, None)
+
+    summary: Dict[str, Any] = {"flow_count": len(rows)}
+    for feature in features:
+        values = [row[feature] for row in rows if feature in row]
+        if values and all(_is_number(v) for v in values):
+            array = np.asarray(values, dtype=np.float64)
+            summary[feature] = {
+                "min": round(float(array.min()), 6),
+                "max": round(float(array.max()), 6),
+                "mean": round(float(array.mean()), 6),
+            }
+        else:
+            counts = Counter(str(v) for v in values)
+            summary[feature] = dict(counts.most_common(TOP_CATEGORIES))
+    return summary
+
+
+def merge_pdfs(reports: List[Report]) -> Report:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for report in reports:
+        writer.append(report.path or io.BytesIO(report.content))
+    output = io.BytesIO()
+    writer.write(output)
+    return make_report(output.getvalue())
+
+
+def zip_pdfs(named_reports: Dict[str, Report]) -> Report:
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, report in named_reports.items():
+            archive.writestr(f"{name}.pdf", report.read())
+    return make_report(output.getvalue(), media_type="application/zip")
+
+
+def _safe_name(threat: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in threat) or "threat"
+
+
+def _unique_names(names: List[str]) -> Dict[str, str]:
+    """Zip entry name of each group: `_safe_name`, with a numeric suffix when
+    distinct groups (e.g. "DoS/x" and "DoS_x") would collide, case-insensitively
+    so archives extract cleanly on every filesystem."""
+    used = set()
+    unique = {}
+    for name in names:
+        candidate = base = _safe_name(name)
+        suffix = 2
+        while candidate.lower() in used:
+            candidate = f"{base}_{suffix}"
+            suffix += 1
+        used.add(candidate.lower())
+        unique[name] = candidate
+    return unique
+
+
+def summarize_groups(rows: List[GenerateReportRequest]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """Group name to the threat label and aggregated threat_data of its report.
+
+    Blocking (CPU-bound for large batches), call through `run_blocking`.
+    """
+    return {threat: (threat, aggregate_group(threat_rows)) for threat, threat_rows in group_rows(rows).items()}
+
+
+async def agenerate_group_reports(
+    groups: Dict[str, Tuple[str, Dict[str, Any]]],
+    output: str = "consolidated",
+) -> Optional[Report]:
+    """Generate one report per group and bundle them.
+
+    Args:
+        groups (Dict[str, Tuple[str, Dict[str, Any]]]): group name to the
+            threat label and threat_data of its report
+        output (str): "consolidated" for one merged PDF, "per_group" for a
+            zip archive holding one PDF per group
+
+    Returns:
+        Optional[Report]: the PDF or zip archive, None if no group could be
+        generated
+    """
+    names = list(groups)
+    tasks = [asyncio.ensure_future(agenerate_report(*groups[name])) for name in names]
+    try:
+        reports = await asyncio.gather(*tasks)
+    except BaseException:
+        # One group failed (rate limit) or the request was cancelled: stop the others
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Report):
+                result.cleanup()
+        raise
+    generated = {
+        name: report for name, report in zip(names, reports) if report is not None
+    }
+    for name in names:
+        if name not in generated:
+            logger.error("Batch report generation failed for group %s", name)
+    if not generated:
+        return None
+
+    try:
+        if output == "per_group":
+            entry_names = _unique_names(list(generated))
+            named_reports = {entry_names[name]: report for name, report in generated.items()}
+            return await run_blocking(zip_pdfs, named_reports)
+        return await run_blocking(merge_pdfs, list(generated.values()))
+    finally:
+        for report in generated.values():
+            report.cleanup()
+
+
+async def agenerate_batch_report(
+    rows: List[GenerateReportRequest],
+    output: str = "consolidated",
+) -> Optional[Report]:
+    """Generate one report per threat group instead of one per row.
+
+    Args:
+        rows (List[GenerateReportRequest]): flagged flows
+        output (str): "consolidated" for one merged PDF, "per_group" for a
+            zip archive holding one PDF per threat group
+
+    Returns:
+        Optional[Report]: the PDF or zip archive, None if no group could be
+        generated
+    """
+    groups = await run_blocking(summarize_groups, rows)
+    logger.info("Batch of %d rows grouped into %d threat groups", len(rows), len(groups))
+    return await agenerate_group_reports(groups, output)
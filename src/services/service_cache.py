@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_crewai.tasks import PROMPT_VERSION
+from src.services.service_executor import run_blocking
+from src.services.service_report import Report
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+
+def canonicalize(value: Any, float_digits: int = settings.REPORT_CACHE_FLOAT_DIGITS) -> Any:
+    """Normalize threat data so that near-identical rows produce the same key.
+
+    Dict keys are stripped and sorted, floats are rounded to `float_digits`
+    significant digits and integral floats are folded into ints (`200.0` and
+    `200` hash the same).
+    """
+    if isinstance(value, dict):
+        return {
+            str(k).strip(): canonicalize(v, float_digits)
+            for k, v in sorted(value.items(), key=lambda item: str(item[0]).strip())
+        }
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v, float_digits) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        value = float(f"{value:.{float_digits}g}")
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def report_cache_key(threat: str, threat_data: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+    """Content address of a report: hash of the request, the model and the prompt version.
+
+    `options` holds the per-request settings that change the rendered output
+    (e.g. the HTML renderer).
+    """
+    payload = {
+        "threat": threat.strip(),
+        "threat_data": canonicalize(threat_data),
+        "options": options or {},
+        "model": settings.MODEL,
+        "prompt_version": PROMPT_VERSION,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """Two-tier cache of rendered report PDFs.
+
+    The on-disk tier is the source of truth: one `<key>.pdf` file per report,
+    evicted by age (`ttl_seconds`) and by total size (`max_bytes`, oldest
+    first). Eviction works from an in-memory index of the files, built by the
+    first disk access (creating the directory), so storing an artifact never
+    rescans it; files other worker processes store join the index once this
+    one reads them. Creating the cache does no I/O.
+
+    The in-memory tier holds the bytes of the most recently used artifacts (at
+    most `memory_entries` of them, `memory_bytes` in total), served without
+    touching the disk. `suffix` and `media_type` let the same store hold other
+    artifacts (e.g. stage outputs as markdown).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        memory_entries: int,
+        memory_bytes: int,
+        max_bytes: int,
+        ttl_seconds: int,
+        suffix: str = ".pdf",
+        media_type: str = "application/pdf",
+    ):
+        self.directory = directory
+        self.suffix = suffix
+        self.media_type = media_type
+        self.memory_entries = memory_entries
+        self.memory_bytes = memory_bytes
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (stored_at, content), least recently used first
+        self._memory: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._memory_size = 0
+        # key -> (stored_at, size) of the files on disk, oldest first
+        self._index: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._index_size = 0
+        self._lock = threading.Lock()
+        self._indexed = False
+        self._index_lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def _expired(self, stored_at: float) -> bool:
+        return time.time() - stored_at > self.ttl_seconds
+
+    def _ensure_index(self):
+        """Create the directory and index the files already in it, once (blocking)."""
+        if self._indexed:
+            return
+        with self._index_lock:
+            if self._indexed:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(self.suffix)]))
+            with self._lock:
+                for stored_at, size, key in sorted(entries):
+                    self._index_file(key, stored_at, size)
+            self._indexed = True
+
+    async def aget(self, key: str) -> Optional[Report]:
+        """`get` that only leaves the event loop on a memory miss."""
+        report = self._get_memory(key)
+        if report is None:
+            report = await run_blocking(self._get_disk, key)
+        return report
+
+    def get(self, key: str) -> Optional[Report]:
+        """Return the cached artifact for `key`, or None on a miss.
+
+        Blocking on a memory miss (file I/O), use `aget` from async code.
+        """
+        report = self._get_memory(key)
+        if report is None:
+            report = self._get_disk(key)
+        return report
+
+    def _get_memory(self, key: str) -> Optional[Report]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            stored_at, content = entry
+            if self._expired(stored_at):
+                self._forget_memory(key)
+                return None
+            self._memory.move_to_end(key)
+            self.hits_memory += 1
+        return Report(content=content, media_type=self.media_type)
+
+    def _get_disk(self, key: str) -> Optional[Report]:
+        self._ensure_index()
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            expired = self._expired(stat.st_mtime)
+            if expired:
+                self._remove(path)
+            content = None
+            if not expired and stat.st_size <= self.memory_bytes:
+                with open(path, "rb") as cached_file:
+                    content = cached_file.read()
+        except OSError:
+            # Missing, or evicted by another worker meanwhile
+            expired = True
+        with self._lock:
+            if expired:
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._index_file(key, stat.st_mtime, stat.st_size)
+            if content is not None:
+                self._remember(key, stat.st_mtime, content)
+            self.hits_disk += 1
+        if content is None:
+            return Report(path=path, media_type=self.media_type)
+        return Report(content=content, media_type=self.media_type)
+
+    def put(self, key: str, content: bytes) -> Report:
+        """Store a freshly rendered artifact and return it backed by its cached file.
+
+        Blocking (file I/O), call through `run_blocking` from async code.
+        """
+        self._ensure_index()
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, path)
+        stored_at = time.time()
+        with self._lock:
+            self._forget(key)
+            self._index_file(key, stored_at, len(content))
+            self._remember(key, stored_at, content)
+            evicted = self._evict()
+        for evicted_path in evicted:
+            self._remove(evicted_path)
+        return Report(path=path, media_type=self.media_type)
+
+    def _index_file(self, key: str, stored_at: float, size: int):
+        if key not in self._index:
+            self._index[key] = (stored_at, size)
+            self._index_size += size
+
+    def _remember(self, key: str, stored_at: float, content: bytes):
+        self._forget_memory(key)
+        if len(content) > self.memory_bytes:
+            return
+        self._memory[key] = (stored_at, content)
+        self._memory_size += len(content)
+        while len(self._memory) > self.memory_entries or self._memory_size > self.memory_bytes:
+            _, (_, dropped) = self._memory.popitem(last=False)
+            self._memory_size -= len(dropped)
+
+    def _forget_memory(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= len(entry[1])
+
+    def _forget(self, key: str):
+        self._forget_memory(key)
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._index_size -= entry[1]
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> List[str]:
+        """Drop the oldest entries while they are expired or the files exceed
+        `max_bytes`; returns the paths to delete."""
+        evicted = []
+        for key, (stored_at, _) in list(self._index.items()):
+            if not self._expired(stored_at) and self._index_size <= self.max_bytes:
+                break
+            self._forget(key)
+            evicted.append(self._path(key))
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._index),
+                "disk_bytes": self._index_size,
+            }
+
+
+_report_cache: Optional[ReportCache] = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    """Return the process-wide report cache, created on first use; only
+    called when `settings.REPORT_CACHE_ENABLED`."""
+    global _report_cache
+    with _report_cache_lock:
+        if _report_cache is None:
+            _report_cache = ReportCache(
+                directory=settings.REPORT_CACHE_DIR,
+                memory_entries=settings.REPORT_CACHE_MEMORY_ENTRIES,
+                memory_bytes=settings.REPORT_CACHE_MEMORY_BYTES,
+                max_bytes=settings.REPORT_CACHE_MAX_BYTES,
+                ttl_seconds=settings.REPORT_CACHE_TTL_SECONDS,
+            )
+    return _report_cache
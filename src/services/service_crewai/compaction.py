@@ -0,0 +1,181 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from src.services.service_ratelimit import estimate_tokens
+
+# Short labels for the UNSW-NB15 flow features, used in the prompts instead of
+# the raw column names.
+FEATURE_LABELS = {
+    "dur": "duration s",
+    "proto": "protocol",
+    "service": "service",
+    "state": "state",
+    "spkts": "src pkts",
+    "dpkts": "dst pkts",
+    "sbytes": "src bytes",
+    "dbytes": "dst bytes",
+    "rate": "pkts/s",
+    "sttl": "src TTL",
+    "dttl": "dst TTL",
+    "sload": "src bits/s",
+    "dload": "dst bits/s",
+    "sloss": "src retransmits",
+    "dloss": "dst retransmits",
+    "sinpkt": "src inter-pkt ms",
+    "dinpkt": "dst inter-pkt ms",
+    "sjit": "src jitter ms",
+    "djit": "dst jitter ms",
+    "swin": "src TCP window",
+    "dwin": "dst TCP window",
+    "stcpb": "src TCP seq",
+    "dtcpb": "dst TCP seq",
+    "tcprtt": "TCP RTT s",
+    "synack": "SYN-ACK s",
+    "ackdat": "ACK-DAT s",
+    "smean": "src mean pkt size",
+    "dmean": "dst mean pkt size",
+    "trans_depth": "HTTP pipeline depth",
+    "response_body_len": "HTTP response bytes",
+    "ct_srv_src": "conns same service+src",
+    "ct_state_ttl": "conns same state+TTL",
+    "ct_dst_ltm": "conns same dst",
+    "ct_src_dport_ltm": "conns same src+dst port",
+    "ct_dst_sport_ltm": "conns same dst+src port",
+    "ct_dst_src_ltm": "conns same src+dst",
+    "is_ftp_login": "FTP login",
+    "ct_ftp_cmd": "FTP commands",
+    "ct_flw_http_mthd": "HTTP methods",
+    "ct_src_ltm": "conns same src",
+    "ct_srv_dst": "conns same service+dst",
+    "is_sm_ips_ports": "same src/dst IP+port",
+}
+
+# Indicative per-class medians of UNSW-NB15 features, the reference the
+# deviation ranking compares against. Classes without an entry use "normal".
+# Approximate values: tune them for the traffic the detectors actually see.
+FEATURE_BASELINES = {
+    "normal": {
+        "dur": 0.5, "spkts": 10, "dpkts": 10, "sbytes": 1000, "dbytes": 2000,
+        "rate": 50, "sload": 20000, "dload": 40000, "sinpkt": 50, "dinpkt": 50,
+        "smean": 80, "dmean": 100, "ct_src_dport_ltm": 1, "ct_srv_src": 4,
+        "sttl": 31, "dttl": 29,
+    },
+    "generic": {
+        "dur": 0.00001, "spkts": 2, "dpkts": 0, "sbytes": 114, "dbytes": 0,
+        "rate": 100000, "sload": 40000000, "dload": 0, "sinpkt": 0.01,
+        "smean": 57, "ct_src_dport_ltm": 20, "ct_srv_src": 20, "sttl": 254,
+    },
+    "dos": {
+        "dur": 0.3, "spkts": 10, "dpkts": 2, "sbytes": 800, "dbytes": 300,
+        "rate": 40, "sload": 25000, "dload": 4000, "sinpkt": 30,
+        "smean": 80, "dmean": 40, "ct_src_dport_ltm": 1, "ct_srv_src": 3, "sttl": 254,
+    },
+}
+
+# Significant digits kept for numeric values in the prompt
+SIGNIFICANT_DIGITS = 3
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_default(value: Any) -> bool:
+    """Zero, empty or placeholder values carry no signal for the analysis."""
+    if value is None or value is False:
+        return True
+    if _is_number(value):
+        return value == 0
+    if isinstance(value, str):
+        return value.strip() in ("", "-")
+    if isinstance(value, dict):
+        return all(_is_default(v) for v in value.values())
+    return False
+
+
+def _format_number(value: float) -> str:
+    if float(value).is_integer() and abs(value) < 10 ** SIGNIFICANT_DIGITS:
+        return str(int(value))
+    return f"{value:.{SIGNIFICANT_DIGITS}g}"
+
+
+def _format_value(value: Any) -> str:
+    if _is_number(value):
+        return _format_number(value)
+    if isinstance(value, dict):
+        # Aggregated groups (batch reports): {"min", "max", "mean"} or value counts
+        if {"min", "max", "mean"} <= set(value):
+            return "/".join(_format_number(value[k]) for k in ("min", "mean", "max")) + " (min/mean/max)"
+        return ", ".join(f"{k} x{_format_value(v)}" for k, v in value.items())
+    return str(value).strip()
+
+
+def _representative(value: Any) -> Optional[float]:
+    if _is_number(value):
+        return float(value)
+    if isinstance(value, dict) and _is_number(value.get("mean")):
+        return float(value["mean"])
+    return None
+
+
+def rank_deviations(detected_threat: str, threat_data: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """Features ordered by how far they are from the threat class baseline.
+
+    The deviation is the absolute log10 ratio to the baseline, so a value ten
+    times above or below the baseline scores 1.
+    """
+    baseline = FEATURE_BASELINES.get(detected_threat.strip().lower(), FEATURE_BASELINES["normal"])
+    deviations = []
+    for key, reference in baseline.items():
+        value = _representative(threat_data.get(key))
+        if value is None:
+            continue
+        # +1 keeps zero values and zero baselines comparable
+        deviations.append((key, abs(math.log10((abs(value) + 1) / (abs(reference) + 1)))))
+    return sorted(deviations, key=lambda item: item[1], reverse=True)
+
+
+class CompactThreatData:
+    """Prompt-ready rendering of a threat_data dict, with its size before and after."""
+
+    def __init__(self, text: str, tokens_before: int, tokens_after: int, deviations: List[str]):
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.deviations = deviations
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def compact_threat_data(detected_threat: str, threat_data: Dict[str, Any], top_deviations: int = 3) -> CompactThreatData:
+    """Shrink threat_data before it is interpolated into the prompts.
+
+    Drops zero/default features, rounds numbers to a few significant digits,
+    replaces the UNSW-NB15 column names with short labels and lists first the
+    features that deviate most from the threat class baseline.
+    """
+    kept = {key: value for key, value in threat_data.items() if not _is_default(value)}
+    flagged = [key for key, score in rank_deviations(detected_threat, kept)[:top_deviations] if score >= 1]
+
+    parts = []
+    if flagged:
+        parts.append("Most anomalous: " + "; ".join(
+            f"{FEATURE_LABELS.get(key, key)}={_format_value(kept[key])}" for key in flagged
+        ))
+    others = [
+        f"{FEATURE_LABELS.get(key, key)}={_format_value(value)}"
+        for key, value in kept.items() if key not in flagged
+    ]
+    if others:
+        parts.append("Other features: " + "; ".join(others))
+    dropped = len(threat_data) - len(kept)
+    if dropped:
+        parts.append(f"({dropped} zero/default features omitted)")
+    text = "\n".join(parts)
+
+    return CompactThreatData(
+        text=text,
+        tokens_before=estimate_tokens(str(threat_data)),
+        tokens_after=estimate_tokens(text),
+        deviations=flagged,
+    )
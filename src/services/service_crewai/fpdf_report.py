@@ -0,0 +1,18 @@
+from fpdf import FPDF, HTMLMixin
+
+class CustomPDF(FPDF, HTMLMixin):
+    def header(self):
+        # Arial bold 15
+        self.set_font('Arial', 'B', 15)
+        # Calculate width of title and position
+        self.cell(0, 10, 'Cybersecurity Threat Analysis Report', 0, 1, 'C')
+        # Line break
+        self.ln(10)
+        
+    def footer(self):
+        # Position at 1.5 cm from bottom
+        self.set_y(-15)
+        # Arial italic 8
+        self.set_font('Arial', 'I', 8)
+        # Page number
+        self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
@@ -1,16 +1,25 @@
-from crewai import Task
+# Task factories return the Task arguments; crewai is only imported by
+# `create_tasks`, so this module (and PROMPT_VERSION) stay cheap to import.
+from src.config.settings import get_settings
 
-def create_tasks(agents, detected_threat, threat_data):
-    task_analyze_threat = Task(
+settings = get_settings()
+
+# Bump whenever the task prompts change, so that reports cached under the old
+# wording are not served again. The HTML template and conversion prompt are
+# hashed into the report key instead (`html_renderer_digest`).
+PROMPT_VERSION = "5"
+
+def _task_analyze_threat(agents, detected_threat, threat_data):
+    return dict(
         description=f"""
         Analyze the detected threat: {detected_threat}
         Threat Data: {threat_data}
 
         1. Define the threat and Classify it.
         2. Evaluate impact on confidentiality, integrity, and availability.
-        3. Identify key indicators in the data.
+        3. Identify key indicators in the data, starting with the most anomalous features.
 
-        Use only the provided data.
+        Use only the provided data. Features not listed are zero or unset.
         """,
         agent=agents["Threat_Analyzer_Agent"],
         expected_output="""
@@ -20,12 +29,13 @@ def create_tasks(agents, detected_threat, threat_data):
         """
     )
 
-    task_develop_mitigation = Task(
+def _task_develop_mitigation(agents, detected_threat, threat_data):
+    return dict(
         description=f"""
-        Develop a mitigation plan for the threat: {detected_threat}
+        Develop a mitigation plan for the threat: {detected_threat} based on the analysis.
 
         1. Provide short-term and long-term mitigation steps.
-        2. Create a concise incident response playbook.
+        2. Write a concise incident response playbook: detection, containment, eradication, recovery, lessons learned.
 
         Ensure all recommendations are very specific to this threat.
         """,
@@ -34,11 +44,31 @@ def create_tasks(agents, detected_threat, threat_data):
         - Short-term and long-term mitigation steps
         - Incident response playbook (bullet points)
         - Justification for each major recommendation
+        """
+    )
+
+def _task_develop_mitigation_from_data(agents, detected_threat, threat_data):
+    # Works from the threat data, not the analysis, so both run in parallel
+    return dict(
+        description=f"""
+        Develop a mitigation plan for the threat: {detected_threat}
+        Threat Data: {threat_data}
+
+        1. Provide short-term and long-term mitigation steps.
+        2. Write a concise incident response playbook: detection, containment, eradication, recovery, lessons learned.
+
+        Ensure all recommendations are very specific to this threat.
         """,
-        context=[task_analyze_threat]
+        agent=agents["Mitigation_Strategist_Agent"],
+        expected_output="""
+        - Short-term and long-term mitigation steps
+        - Incident response playbook (bullet points)
+        - Justification for each major recommendation
+        """
     )
 
-    task_generate_report = Task(
+def _task_generate_report(agents, detected_threat, threat_data):
+    return dict(
         description=f"""
         Create a comprehensive incident report for: {detected_threat} based on the analysis and mitigation plan.
         Ensure consistency across sections.
@@ -53,12 +83,81 @@ def create_tasks(agents, detected_threat, threat_data):
         5. Conclusions
 
         The report should be factual, consistent, and actionable.
+        """
+    )
+
+def _task_generate_brief_report(agents, detected_threat, threat_data):
+    return dict(
+        description=f"""
+        Create a short incident report for: {detected_threat} based on the analysis.
+        Include routine recommendations only, no incident response playbook.
         """,
-        context=[task_analyze_threat, task_develop_mitigation]
+        agent=agents["Report_Generator_Agent"],
+        expected_output="""
+        A structured report with:
+        1. Executive Summary
+        2. Threat Analysis
+        3. Impact Assessment
+        4. Mitigation Strategy
+        5. Conclusions
+
+        Keep every section brief.
+        """
     )
 
-    return [
-        task_analyze_threat,
-        task_develop_mitigation,
-        task_generate_report
-    ]
\ No newline at end of file
+TASK_FACTORIES = {
+    "analysis": _task_analyze_threat,
+    "mitigation": _task_develop_mitigation,
+    "mitigation_from_data": _task_develop_mitigation_from_data,
+    "report": _task_generate_report,
+    "brief_report": _task_generate_brief_report,
+}
+
+# Task graphs: node -> the nodes whose output it receives as context.
+# Each graph has a single sink, whose output is the final report.
+TASK_GRAPHS = {
+    "full": {
+        "analysis": [],
+        "mitigation": ["analysis"],
+        "report": ["analysis", "mitigation"],
+    },
+    # "full" with one step less on the critical path, at the cost of a
+    # mitigation plan written without the analysis (PARALLEL_MITIGATION)
+    "parallel": {
+        "analysis": [],
+        "mitigation_from_data": [],
+        "report": ["analysis", "mitigation_from_data"],
+    },
+    "brief": {
+        "analysis": [],
+        "brief_report": ["analysis"],
+    },
+}
+
+# Threat labels (lower case) that take a cheaper graph than "full"
+THREAT_TASK_GRAPHS = {
+    "safe": "brief",
+    "normal": "brief",
+}
+
+def task_graph_for(detected_threat):
+    """Name of the task graph used for a threat label."""
+    graph = THREAT_TASK_GRAPHS.get(detected_threat.strip().lower(), "full")
+    if graph == "full" and settings.PARALLEL_MITIGATION:
+        return "parallel"
+    return graph
+
+def create_tasks(agents, detected_threat, threat_data):
+    """Build the task graph for a threat.
+
+    Returns:
+        dict: node name -> (Task, names of the nodes it depends on), in
+        declaration order
+    """
+    from crewai import Task
+
+    graph = TASK_GRAPHS[task_graph_for(detected_threat)]
+    return {
+        name: (Task(**TASK_FACTORIES[name](agents, detected_threat, threat_data)), deps)
+        for name, deps in graph.items()
+    }
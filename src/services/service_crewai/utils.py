@@ -1,88 +1,158 @@
-import streamlit as st
-import markdown2
+# Heavy or optional dependencies (markdown2, pdfkit, fpdf, groq, streamlit)
+# are imported by the functions that need them, so importing this module
+# stays cheap for the API process.
+import functools
+import hashlib
 import tempfile
-import pdfkit
 import json
 import os
-from fpdf import FPDF, HTMLMixin
 from datetime import datetime
-from groq import Groq
-import os 
-def html_to_pdf(html_text, output_pdf_path):
-    options = {
-        'page-size': 'A3',
-        'margin-top': '0mm',
-        'margin-right': '0mm',
-        'margin-bottom': '0mm',
-        'margin-left': '0mm',
-        'encoding': 'UTF-8',
-        'no-outline': None,
-        'enable-local-file-access': None,
-        'dpi': 300,
-        'zoom': 1.0,
-        'enable-smart-shrinking': True,
-        'print-media-type': True
-    }
-    config = pdfkit.configuration(wkhtmltopdf=r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe')
-    pdfkit.from_string(html_text, output_pdf_path,options=options, configuration=config)
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+MARKDOWN_EXTRAS = [
+    "tables",
+    "code-friendly",
+    "fenced-code-blocks",
+    "break-on-newline"
+]
+_report_template = None
+WKHTMLTOPDF_OPTIONS = {
+    'page-size': 'A3',
+    'margin-top': '0mm',
+    'margin-right': '0mm',
+    'margin-bottom': '0mm',
+    'margin-left': '0mm',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    # The page comes from LLM output; it must not pull local files into the PDF
+    'disable-local-file-access': None,
+    'dpi': 300,
+    'zoom': 1.0,
+    'enable-smart-shrinking': True,
+    'print-media-type': True
+}
+
+def html_to_pdf(html_text, output_pdf_path=False, wkhtmltopdf_path=None):
+    """Render HTML to PDF with wkhtmltopdf (one process per call).
+
+    With `output_pdf_path=False` the PDF is returned as bytes instead of
+    written to a file. `wkhtmltopdf_path` defaults to the binary found on PATH.
+    """
+    import pdfkit
+
+    config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path or "")
+    return pdfkit.from_string(html_text, output_pdf_path, options=WKHTMLTOPDF_OPTIONS, configuration=config)
+
+HTML_REPORT_PROMPT = "\n Convert this report into a professional, visually appealing HTML page designed for a cybersecurity threat detection report. Maintain the exact content without any alterations. Use CSS to create a modern and polished design, prioritizing readability, organized layout, and aesthetic appeal. Implement distinct sections, headers, and subheaders, and use color schemes appropriate for cybersecurity contexts (such as dark and red). Include icons or styling for important elements to highlight key information. Return only the HTML content without additional text or explanations."
+HTML_REPORT_MODEL = "mixtral-8x7b-32768"
+
+def _html_report_messages(data):
+    return [
+        {
+            "role": "user",
+            "content": data + HTML_REPORT_PROMPT,
+        }
+    ]
 
 def generate_html_report(data, client):
     chat_completion = client.chat.completions.create(
-        messages = [
-            {
-                "role": "user",
-                "content": (
-                    data + "\n Convert this report into a professional, visually appealing HTML page designed for a cybersecurity threat detection report. Maintain the exact content without any alterations. Use CSS to create a modern and polished design, prioritizing readability, organized layout, and aesthetic appeal. Implement distinct sections, headers, and subheaders, and use color schemes appropriate for cybersecurity contexts (such as dark and red). Include icons or styling for important elements to highlight key information. Return only the HTML content without additional text or explanations."
-                ),
-            }
-        ],
-        model="mixtral-8x7b-32768",
+        messages=_html_report_messages(data),
+        model=HTML_REPORT_MODEL,
+    )
+    return chat_completion.choices[0].message.content
+
+async def agenerate_html_report(data, client):
+    """Async counterpart of `generate_html_report` for an `AsyncGroq` client."""
+    chat_completion = await client.chat.completions.create(
+        messages=_html_report_messages(data),
+        model=HTML_REPORT_MODEL,
     )
     return chat_completion.choices[0].message.content
 
+def markdown_to_html(md_text):
+    """Markdown to HTML with raw HTML in the text escaped: the report is LLM
+    output and ends up in the page unescaped."""
+    import markdown2
+
+    return markdown2.markdown(md_text, extras=MARKDOWN_EXTRAS, safe_mode="escape")
+
+async def astream_html_report(data, client):
+    """Stream the HTML conversion from an `AsyncGroq` client, yielding text deltas."""
+    stream = await client.chat.completions.create(
+        messages=_html_report_messages(data),
+        model=HTML_REPORT_MODEL,
+        stream=True,
+    )
+    try:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        # Releases the connection, aborting the completion if we stopped early
+        await stream.close()
+
+def load_report_template():
+    """Compile the HTML report template once; called at application startup."""
+    global _report_template
+    if _report_template is None:
+        environment = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            autoescape=select_autoescape(["html"]),
+        )
+        _report_template = environment.get_template("report.html")
+    return _report_template
+
+@functools.lru_cache(maxsize=None)
+def html_renderer_digest(html_renderer):
+    """Hash of what turns a report into HTML besides its text: the loaded
+    template and markdown extras, or the LLM conversion prompt and model.
+    Part of the report cache key, so editing them invalidates cached pages."""
+    if html_renderer == "template":
+        with open(load_report_template().filename, "rb") as template_file:
+            parts = [template_file.read(), json.dumps(MARKDOWN_EXTRAS).encode("utf-8")]
+    else:
+        parts = [HTML_REPORT_PROMPT.encode("utf-8"), HTML_REPORT_MODEL.encode("utf-8")]
+    return hashlib.sha256(b"\0".join(parts)).hexdigest()[:16]
+
+def render_html_report(md_text, threat):
+    """Render the markdown report into the themed HTML page locally, without an LLM call."""
+    body = markdown_to_html(md_text)
+    return load_report_template().render(
+        body=body,
+        threat=threat,
+        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
 def json_to_string(json_data):
     data = json.load(json_data)
     return json.dumps(data)
 
 def get_groq_client():
+    from groq import Groq
+
     groq_api = os.getenv("GROQ_API_KEY")
     return Groq(api_key=groq_api)
 
+def get_async_groq_client():
+    from groq import AsyncGroq
+
+    groq_api = os.getenv("GROQ_API_KEY")
+    return AsyncGroq(api_key=groq_api)
+
 def display_message(role, content):
+    # Only meaningful inside a Streamlit app
+    import streamlit as st
+
     st.markdown(f"**{role}**: {content}")
 
-class CustomPDF(FPDF, HTMLMixin):
-    def header(self):
-        # Arial bold 15
-        self.set_font('Arial', 'B', 15)
-        # Calculate width of title and position
-        self.cell(0, 10, 'Cybersecurity Threat Analysis Report', 0, 1, 'C')
-        # Line break
-        self.ln(10)
-        
-    def footer(self):
-        # Position at 1.5 cm from bottom
-        self.set_y(-15)
-        # Arial italic 8
-        self.set_font('Arial', 'I', 8)
-        # Page number
-        self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
+def _build_report_pdf(md_text):
+    """Lay out markdown text in a `CustomPDF` document"""
+    from src.services.service_crewai.fpdf_report import CustomPDF
 
-def save_report_as_pdf(md_text, output_pdf_path):
-    """
-    Convert markdown text to a well-formatted PDF file
-    
-    Args:
-        md_text (str): Markdown formatted text
-        output_pdf_path (str): Path where to save the PDF file
-    """
     # Convert markdown to HTML with extra features
-    html = markdown2.markdown(md_text, extras=[
-        "tables",
-        "code-friendly",
-        "fenced-code-blocks",
-        "break-on-newline"
-    ])
+    html = markdown_to_html(md_text)
     
     # Initialize PDF
     pdf = CustomPDF()
@@ -110,6 +180,28 @@ def save_report_as_pdf(md_text, output_pdf_path):
     except Exception as e:
         # Fallback to basic text if HTML conversion fails
         pdf.multi_cell(0, 10, md_text)
+
+    return pdf
+
+def report_to_pdf_bytes(md_text):
+    """
+    Convert markdown text to a well-formatted PDF, returned as bytes
+    
+    Args:
+        md_text (str): Markdown formatted text
+    """
+    # FPDF 1.x returns the document as a latin-1 string
+    return _build_report_pdf(md_text).output(dest="S").encode("latin-1")
+
+def save_report_as_pdf(md_text, output_pdf_path):
+    """
+    Convert markdown text to a well-formatted PDF file
+    
+    Args:
+        md_text (str): Markdown formatted text
+        output_pdf_path (str): Path where to save the PDF file
+    """
+    pdf = _build_report_pdf(md_text)
     
     # Save the PDF
     try:
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.logger.logger import get_logger
+from src.services.service_executor import run_blocking
+
+logger = get_logger(__file__)
+
+# node name -> (task exposing a blocking `execute(context=...)`, dependency names)
+TaskGraph = Dict[str, Tuple[Any, List[str]]]
+
+
+def graph_output(graph: TaskGraph) -> str:
+    """Return the single node no other node depends on.
+
+    Raises:
+        ValueError: when the graph has unknown dependencies, a cycle, or
+            not exactly one sink
+    """
+    for name, (_, deps) in graph.items():
+        unknown = [dep for dep in deps if dep not in graph]
+        if unknown:
+            raise ValueError(f"Task {name} depends on unknown tasks {unknown}")
+
+    # Kahn's algorithm, only to reject cycles
+    remaining = {name: set(deps) for name, (_, deps) in graph.items()}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Task graph has a cycle between {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    depended_on = {dep for _, deps in graph.values() for dep in deps}
+    sinks = [name for name in graph if name not in depended_on]
+    if len(sinks) != 1:
+        raise ValueError(f"Task graph must have exactly one output task, found {sinks}")
+    return sinks[0]
+
+
+async def _execute(name: str, task: Any, context: Optional[str]) -> str:
+    # Blocking: CrewAI and ChatGroq are synchronous
+    return await run_blocking(task.execute, context=context)
+
+
+async def arun_task_graph(
+    graph: TaskGraph,
+    execute: Callable[[str, Any, Optional[str]], Awaitable[str]] = _execute,
+) -> AsyncIterator[Tuple[str, str]]:
+    """Execute a task graph, running independent tasks concurrently.
+
+    Each task starts as soon as all of its dependencies are done and receives
+    their outputs, joined, as its context; `execute(name, task, context)` runs it.
+    Yields `(name, output)` pairs in completion order. If a task fails, or the
+    caller stops iterating, the tasks still running are cancelled.
+    """
+    graph_output(graph)
+    outputs: Dict[str, str] = {}
+    pending = list(graph)
+    running: Dict[asyncio.Future, str] = {}
+
+    def launch_ready():
+        for name in list(pending):
+            task, deps = graph[name]
+            if all(dep in outputs for dep in deps):
+                pending.remove(name)
+                context = "\n\n".join(outputs[dep] for dep in deps) or None
+                future = asyncio.ensure_future(execute(name, task, context))
+                running[future] = name
+
+    try:
+        launch_ready()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                outputs[name] = future.result()
+                yield name, outputs[name]
+            launch_ready()
+    finally:
+        for future in running:
+            future.cancel()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_metrics import metrics
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+T = TypeVar("T")
+
+
+class RequestAbandoned(Exception):
+    """Raised once the work of a request has been cancelled because its
+    deadline passed (`reason` "deadline") or its client went away
+    ("disconnected")."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request abandoned ({reason})")
+        self.reason = reason
+
+
+class Deadline:
+    """Runs a request's work until it completes, its deadline passes or its
+    client disconnects, whichever comes first; in the last two cases the work
+    is cancelled (pending pipeline stages never start, streamed LLM calls are
+    closed) and `RequestAbandoned` is raised.
+
+    `is_disconnected` is polled every `poll_interval` seconds, e.g.
+    `request.is_disconnected` in a route.
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        poll_interval: float = settings.DISCONNECT_POLL_SECONDS,
+    ):
+        self.expires_at = time.monotonic() + seconds
+        self.is_disconnected = is_disconnected
+        self.poll_interval = poll_interval
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    async def _until_disconnected(self):
+        while not await self.is_disconnected():
+            await asyncio.sleep(self.poll_interval)
+
+    async def _abandon(self, work: asyncio.Future, reason: str):
+        work.cancel()
+        # Let the cancellation unwind (pipeline cleanup, abandonment metrics)
+        await asyncio.gather(work, return_exceptions=True)
+        metrics.requests_abandoned.inc(reason=reason)
+        logger.warning("Request abandoned (%s), its remaining work was cancelled", reason)
+        raise RequestAbandoned(reason)
+
+    async def _wait(self, work: asyncio.Future, watcher: Optional[asyncio.Future]) -> Any:
+        try:
+            done, _ = await asyncio.wait(
+                [work] if watcher is None else [work, watcher],
+                timeout=self.remaining(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        except asyncio.CancelledError:
+            work.cancel()
+            raise
+        if work in done:
+            return work.result()
+        await self._abandon(work, "disconnected" if watcher in done else "deadline")
+
+    def _watch(self) -> Optional[asyncio.Future]:
+        if self.is_disconnected is None:
+            return None
+        return asyncio.ensure_future(self._until_disconnected())
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Result of `awaitable`, or `RequestAbandoned`."""
+        watcher = self._watch()
+        try:
+            return await self._wait(asyncio.ensure_future(awaitable), watcher)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    async def iterate(self, iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+        """Items of `iterator`, until it ends or the request is abandoned."""
+        watcher = self._watch()
+        try:
+            while True:
+                try:
+                    item = await self._wait(asyncio.ensure_future(iterator.__anext__()), watcher)
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            await iterator.aclose()
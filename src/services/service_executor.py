@@ -0,0 +1,36 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+# Dedicated pool for the blocking stages of the pipeline (CrewAI task execution,
+# PDF rendering, ...). Kept separate from the loop's default executor so a burst
+# of reports cannot starve anything else that relies on `asyncio.to_thread`.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_POOL_WORKERS,
+    thread_name_prefix="report-blocking",
+)
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable in the blocking pool and await its result.
+
+    Args:
+        func (Callable): synchronous function to run
+        *args, **kwargs: arguments forwarded to `func`
+
+    Returns:
+        Any: whatever `func` returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    logger.info("Shutting down blocking pool")
+    _executor.shutdown(wait=False, cancel_futures=True)
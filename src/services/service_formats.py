@@ -0,0 +1,162 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Output format -> (media type, download file name)
+OUTPUT_FORMATS = {
+    "markdown": ("text/markdown", "report.md"),
+    "json": ("application/json", "report.json"),
+    "html": ("text/html", "report.html"),
+    "pdf": ("application/pdf", "report.pdf"),
+}
+DEFAULT_FORMAT = "pdf"
+# Server preference among the formats an Accept range covers equally (`*/*`, `text/*`)
+FORMAT_PREFERENCE = (DEFAULT_FORMAT, "html", "markdown", "json")
+
+# Accept header media types understood besides the canonical ones
+_MEDIA_TYPE_ALIASES = {
+    "text/x-markdown": "markdown",
+    "text/plain": "markdown",
+    "application/xhtml+xml": "html",
+}
+
+# JSON field -> heading titles (lower case) the report task may use for it
+REPORT_SECTIONS = {
+    "executive_summary": ("executive summary", "summary"),
+    "threat_analysis": ("threat analysis", "analysis"),
+    "impact_assessment": ("impact assessment", "impact"),
+    "mitigation_strategy": ("mitigation strategy", "mitigation", "mitigation plan"),
+    "conclusions": ("conclusions", "conclusion"),
+}
+_SECTION_TITLES = {title: field for field, titles in REPORT_SECTIONS.items() for title in titles}
+_TITLES_LONGEST_FIRST = sorted(_SECTION_TITLES, key=len, reverse=True)
+
+# Markdown heading, bold and numbering markers in front of a section title
+_HEADING_PREFIX = re.compile(r"^\s*(?:#{1,6}\s+)?(?:\*\*|__)?\s*(?:\d+[.)]\s*)?")
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float, int]]:
+    """(media range, quality, position) of each range of an `Accept` header.
+
+    Malformed ranges, and ranges whose q is not a number between 0 and 1, are
+    dropped.
+    """
+    ranges = []
+    for position, item in enumerate(accept.split(",")):
+        media_range, *params = item.split(";")
+        media_range = media_range.strip().lower()
+        if media_range.count("/") != 1:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = -1.0
+        if 0 <= quality <= 1:
+            ranges.append((media_range, quality, position))
+    return ranges
+
+
+def _specificity(media_range: str, name: str) -> int:
+    """How closely `media_range` names format `name`: 2 for its media type (or
+    an alias of it), 1 for `type/*`, 0 for `*/*`, -1 if it is not covered.
+
+    Wildcards only cover the media type the format is served as.
+    """
+    media_type = OUTPUT_FORMATS[name][0]
+    if media_range == media_type or _MEDIA_TYPE_ALIASES.get(media_range) == name:
+        return 2
+    range_type, _, range_subtype = media_range.partition("/")
+    if range_subtype != "*":
+        return -1
+    if range_type == "*":
+        return 0
+    return 1 if media_type.startswith(f"{range_type}/") else -1
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+    """Output format of a request: `requested` (query parameter) if given, else
+    the best supported media type of the `Accept` header.
+
+    The quality of each supported type is that of the most specific range
+    covering it (`application/pdf;q=0` excludes PDF from `application/*`).
+    Highest quality wins, then the more specific range, then header order;
+    formats a wildcard covers equally go by `FORMAT_PREFERENCE`, so `*/*` and
+    `application/*` give PDF and `text/*` HTML.
+
+    Returns:
+        Optional[str]: the format, `DEFAULT_FORMAT` when there is no header,
+        None when nothing acceptable is supported
+    """
+    if requested:
+        return requested
+    if not accept:
+        return DEFAULT_FORMAT
+    ranges = _parse_accept(accept)
+    candidates = []
+    for preference, name in enumerate(FORMAT_PREFERENCE):
+        matches = [
+            (specificity, quality, position)
+            for media_range, quality, position in ranges
+            if (specificity := _specificity(media_range, name)) >= 0
+        ]
+        if not matches:
+            continue
+        specificity, quality, position = max(matches, key=lambda match: match[:2])
+        if quality > 0:
+            candidates.append((-quality, -specificity, position, preference, name))
+    return min(candidates)[-1] if candidates else None
+
+
+def _section_heading(line: str) -> Optional[Tuple[str, str]]:
+    """(field, text after the heading) if `line` opens a report section.
+
+    Matches "## 1. Executive Summary", "**Threat Analysis**", "4) Mitigation
+    Strategy", "**Impact Assessment:** text" and "Conclusions:", but not a
+    sentence such as "Impact: high".
+    """
+    prefix = _HEADING_PREFIX.match(line)
+    marked = bool(prefix.group(0).strip())
+    text = line[prefix.end():]
+    for title in _TITLES_LONGEST_FIRST:
+        if not text.lower().startswith(title):
+            continue
+        rest = text[len(title):].lstrip(" *_")
+        has_colon = rest.startswith(":")
+        rest = rest[1:].lstrip(" *_").strip() if has_colon else rest.strip()
+        if not rest or (marked and has_colon):
+            return _SECTION_TITLES[title], rest
+        return None
+    return None
+
+
+def parse_report_sections(markdown: str) -> Dict[str, str]:
+    """Split the final report into its sections (`REPORT_SECTIONS` fields).
+
+    A section runs from its heading to the next section heading; other
+    headings (the title, sub-headings) stay in the text. Missing sections
+    are empty strings.
+    """
+    sections = {field: [] for field in REPORT_SECTIONS}
+    current = None
+    for line in markdown.splitlines():
+        heading = _section_heading(line)
+        if heading is not None:
+            current, rest = heading
+            if rest:
+                sections[current].append(rest)
+        elif current is not None:
+            sections[current].append(line)
+    return {field: "\n".join(lines).strip() for field, lines in sections.items()}
+
+
+def report_json(threat: str, markdown: str) -> bytes:
+    """The JSON output format: the report split into sections, plus its markdown."""
+    return json.dumps({
+        "threat": threat,
+        "sections": parse_report_sections(markdown),
+        "markdown": markdown,
+    }).encode("utf-8")
@@ -1,50 +1,310 @@
-from langchain_groq import ChatGroq
-from crewai import Crew
-import uuid
-import os
-from fastapi.responses import FileResponse
-from typing import Dict 
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from src.config.settings import get_settings
 from src.logger.logger import get_logger
-from src.services.service_crewai.agents import create_agents
-from src.services.service_crewai.tasks import create_tasks
+from src.services.service_crewai.tasks import create_tasks, task_graph_for
+from src.services.service_crewai.compaction import compact_threat_data
 from src.services.service_crewai.utils import * 
+from src.services.service_executor import run_blocking
+from src.services.service_dag import arun_task_graph, graph_output
+from src.services.service_resources import resources
+from src.services.service_ratelimit import llm_scheduler, estimate_tokens, RateLimitExceeded
+from src.services.service_cache import get_report_cache, report_cache_key
+from src.services.service_pdf import astarted_pdf_backend
+from src.services.service_report import Report, make_report
+from src.services.service_formats import OUTPUT_FORMATS, DEFAULT_FORMAT, report_json
+from src.services.service_metrics import metrics, span
+from src.services.service_singleflight import report_flights
+from src.services.service_artifacts import (
+    stage_artifact_keys, load_stage_artifacts, prune_cached, get_stage_cache, stage_runs,
+)
+from src.logger.logger import request_id_var
 
 settings = get_settings()
 logger = get_logger(__file__)
 
 
-async def agenerate_report(threat : str , threat_data : Dict ) : 
-    try : 
-        client = get_groq_client()
-        llm = ChatGroq(
-            temperature=0, 
-            groq_api_key=settings.GROQ_API_KEY, 
-            model_name=settings.MODEL
+def _task_tokens(task, context : Optional[str]) -> int :
+    return estimate_tokens(
+        task.description,
+        task.expected_output,
+        task.agent.backstory,
+        context,
+        completion_tokens=settings.LLM_COMPLETION_TOKENS_ESTIMATE,
+    )
+
+
+def _run_task(task, context : Optional[str], cache_key : Optional[str]) -> str :
+    """Blocking run of a CrewAI task. The output is cached from the worker
+    thread, so a task that outlives its abandoned report still pays off."""
+    output = task.execute(context=context)
+    if cache_key is not None:
+        get_stage_cache().put(cache_key, output.encode("utf-8"))
+    return output
+
+
+async def _execute_task(stage : str , task, context : Optional[str], cache_key : Optional[str] = None) -> str :
+    """Run one CrewAI task through the LLM scheduler."""
+    tokens = _task_tokens(task, context)
+    with span(stage, model=settings.MODEL, tokens=tokens):
+        # Blocking: CrewAI and ChatGroq are synchronous
+        return await llm_scheduler.call(
+            settings.MODEL, tokens, lambda: run_blocking(_run_task, task, context, cache_key)
         )
-        agents = create_agents(llm)
-        tasks = create_tasks(agents, threat, threat_data)
-        crew = Crew(
-                agents=list(agents.values()),
-                tasks=tasks,
-                verbose=2
+
+
+class _Progress:
+    """Stages a report has not finished yet, accounted as saved work when
+    the report is abandoned (cancelled, or its stream closed early)."""
+
+    def __init__(self):
+        self.pending : Dict[str, int] = {}  # stage -> estimated LLM tokens
+        self.running : Set[str] = set()
+
+    def plan(self, stage : str , tokens : int = 0):
+        self.pending[stage] = tokens
+
+    def start(self, stage : str):
+        self.pending.pop(stage, None)
+        self.running.add(stage)
+
+    def finish(self, stage : str):
+        self.running.discard(stage)
+
+    def abandon(self):
+        for stage, tokens in self.pending.items():
+            metrics.stages_abandoned.inc(stage=stage, state="not_started")
+            metrics.llm_tokens_saved.inc(tokens)
+        for stage in self.running:
+            metrics.stages_abandoned.inc(stage=stage, state="interrupted")
+        if self.pending or self.running:
+            logger.info(
+                "Report abandoned: %d stages not started (~%d LLM tokens saved), %d interrupted",
+                len(self.pending), sum(self.pending.values()), len(self.running),
+            )
+        self.pending, self.running = {}, set()
+
+
+async def _areport_key(threat : str , threat_data : Dict , html_renderer : str , output_format : str = DEFAULT_FORMAT) -> str :
+    """Identity of a report: same key, same output (cache and in-flight coalescing).
+
+    PDFs are keyed on the backend that renders them once startup has settled,
+    i.e. fpdf when the configured backend failed to start.
+    """
+    if output_format == "pdf":
+        pdf_backend = await astarted_pdf_backend()
+        options = {"html_renderer": html_renderer, "pdf_backend": pdf_backend.name}
+    elif output_format == "html":
+        options = {"format": output_format, "html_renderer": html_renderer}
+    else:
+        options = {"format": output_format}
+    if output_format in ("pdf", "html"):
+        options["html_digest"] = html_renderer_digest(html_renderer)
+    options["prompt_compaction"] = settings.PROMPT_COMPACTION_ENABLED
+    if settings.PROMPT_COMPACTION_ENABLED:
+        options["prompt_top_deviations"] = settings.PROMPT_TOP_DEVIATIONS
+    options["task_graph"] = task_graph_for(threat)
+    return report_cache_key(threat, threat_data, options)
+
+
+async def astream_report(
+    threat : str ,
+    threat_data : Dict ,
+    html_renderer : Optional[str] = None ,
+    output_format : str = DEFAULT_FORMAT ,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]] :
+    """Run the report pipeline, yielding `(event, data)` pairs as it progresses.
+
+    Only the stages `output_format` needs are run: "markdown" and "json" stop
+    after the agents, "html" after the HTML conversion, "pdf" renders it.
+
+    Events, in order:
+        stage:  {"stage", "output", "reused"} once per CrewAI task that the
+                report needs, in completion order; `reused` when the output
+                came from the stage cache
+        token:  {"delta"} for each chunk of the HTML conversion (html and pdf
+                formats, llm renderer only)
+        report: {"report", "cached", "run"} once the output is ready (a
+                `Report` in `output_format`); `run` tells which stages were
+                reused, generated or skipped, and is also recorded under the
+                request id
+
+    A report cache hit (pdf only) yields the `report` event only. Errors are
+    raised to the caller, `RateLimitExceeded` when the LLM provider's budget
+    is exhausted.
+
+    Cancelling the iteration, or closing it early, abandons the report: the
+    stages not started yet never start, a streamed HTML conversion is closed
+    and nothing is rendered. Agent calls already running in worker threads
+    cannot be interrupted; they finish and their outputs still reach the stage
+    cache. The work saved is counted in `metrics`.
+    """
+    progress = _Progress()
+    async with aclosing(_astream_report(threat, threat_data, html_renderer, output_format, progress)) as events:
+        try:
+            async for item in events:
+                yield item
+        except (asyncio.CancelledError, GeneratorExit):
+            progress.abandon()
+            raise
+
+
+async def _astream_report(
+    threat : str ,
+    threat_data : Dict ,
+    html_renderer : Optional[str] ,
+    output_format : str ,
+    progress : _Progress ,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]] :
+    html_renderer = html_renderer or settings.HTML_RENDERER
+    media_type = OUTPUT_FORMATS[output_format][0]
+    run = {"threat": threat, "format": output_format, "report_cache": "disabled", "stages": {}}
+    report_key = await _areport_key(threat, threat_data, html_renderer, output_format)
+    cache_key = None
+    # The report cache holds PDFs; the cheaper formats rely on the stage cache
+    if settings.REPORT_CACHE_ENABLED and output_format == "pdf":
+        with span("cache_lookup") as lookup:
+            cache_key = report_key
+            cached_report = await get_report_cache().aget(cache_key)
+            run["report_cache"] = "miss" if cached_report is None else "hit"
+            lookup.set(cache=run["report_cache"])
+        if cached_report is not None:
+            logger.info("Report cache hit for %s (%.12s)", threat, cache_key)
+            await stage_runs.record(request_id_var.get(), report_key, run)
+            yield "report", {"report": cached_report, "cached": True, "run": run}
+            return
+
+    prompt_data = threat_data
+    if settings.PROMPT_COMPACTION_ENABLED:
+        compacted = compact_threat_data(threat, threat_data, settings.PROMPT_TOP_DEVIATIONS)
+        logger.info(
+            "Compacted threat data for %s: ~%d -> ~%d tokens, most anomalous %s",
+            threat, compacted.tokens_before, compacted.tokens_after, compacted.deviations,
         )
-        for task in crew.tasks:
-            result = task.execute()
+        prompt_data = compacted.text
 
-        path_prefix = r"C:\\Users\\"
-        pdf_file_name = r"cybersecurity_report" + str(uuid.uuid4()) + ".pdf" 
-        pdf_file_path = path_prefix + pdf_file_name
-        print("PDF file path :", pdf_file_path)
-        html_report = generate_html_report(result, client)
-        print(html_report)
-        html_to_pdf(html_report, pdf_file_path)
-        print("HTML to PDF conversion done")
+    # Agents and LLM clients are prebuilt, the request only binds its task text
+    async with resources.agents(settings.MODEL) as agents:
+        graph = create_tasks(agents, threat, prompt_data)
+        output_stage = graph_output(graph)
+        run["stages"] = {stage: "skipped" for stage in graph}
+        artifacts, stage_keys = {}, {}
+        if settings.STAGE_CACHE_ENABLED:
+            stage_keys = stage_artifact_keys(graph)
+            artifacts = await run_blocking(load_stage_artifacts, stage_keys)
+            graph = prune_cached(graph, output_stage, set(artifacts))
+        llm_calls : Dict[str, List[int]] = {}
+        for stage, (task, _) in graph.items():
+            if stage not in artifacts:
+                tokens = _task_tokens(task, None)
+                progress.plan(stage, tokens)
+                llm_calls.setdefault(settings.MODEL, []).append(tokens)
+        if output_format in ("html", "pdf"):
+            # The report is not known yet; it is about one completion long
+            html_tokens = settings.LLM_COMPLETION_TOKENS_ESTIMATE * 3 if html_renderer == "llm" else 0
+            progress.plan("html", html_tokens)
+            if html_renderer == "llm":
+                llm_calls.setdefault(HTML_REPORT_MODEL, []).append(html_tokens)
+        if output_format == "pdf":
+            progress.plan("pdf")
+        # Shed the request before its first call rather than at a later stage
+        await llm_scheduler.check_capacity(llm_calls)
 
-        return pdf_file_path
+        async def execute(stage : str , task, context : Optional[str]) -> str :
+            if stage in artifacts:
+                with span(stage, reused=True):
+                    return artifacts[stage]
+            progress.start(stage)
+            output = await _execute_task(stage, task, context, stage_keys.get(stage))
+            progress.finish(stage)
+            return output
 
+        async for stage, output in arun_task_graph(graph, execute):
+            if stage == output_stage:
+                result = output
+            run["stages"][stage] = "reused" if stage in artifacts else "generated"
+            yield "stage", {"stage": stage, "output": output, "reused": stage in artifacts}
 
-    except Exception as e :
-        logger.error(f"Error occured in service_report_generator.generate_report : {e}")
+    if output_format in ("markdown", "json"):
+        content = result.encode("utf-8") if output_format == "markdown" else report_json(threat, result)
+        await stage_runs.record(request_id_var.get(), report_key, run)
+        yield "report", {"report": await run_blocking(make_report, content, media_type), "cached": False, "run": run}
+        return
+
+    progress.start("html")
+    if html_renderer == "llm":
+        html_chunks = []
+        tokens = estimate_tokens(
+            result, HTML_REPORT_PROMPT, completion_tokens=estimate_tokens(result) * 2
+        )
+        with span("html", renderer=html_renderer, model=HTML_REPORT_MODEL, tokens=tokens):
+            # Closed explicitly so an abandoned report aborts the HTTP call
+            async with aclosing(llm_scheduler.stream(
+                HTML_REPORT_MODEL, tokens, lambda: astream_html_report(result, resources.async_groq)
+            )) as deltas:
+                async for delta in deltas:
+                    html_chunks.append(delta)
+                    yield "token", {"delta": delta}
+        html_report = "".join(html_chunks)
+    else:
+        with span("html", renderer=html_renderer):
+            html_report = await run_blocking(render_html_report, result, threat)
+    progress.finish("html")
+
+    if output_format == "html":
+        await stage_runs.record(request_id_var.get(), report_key, run)
+        html_content = html_report.encode("utf-8")
+        yield "report", {"report": await run_blocking(make_report, html_content, media_type), "cached": False, "run": run}
+        return
+
+    progress.start("pdf")
+    pdf_backend = await astarted_pdf_backend()
+    with span("pdf", backend=pdf_backend.name) as pdf_span:
+        pdf_content = await pdf_backend.arender(html_report, result)
+        pdf_span.set(bytes=len(pdf_content))
+    progress.finish("pdf")
+    logger.info("HTML to PDF conversion done (%d bytes)", len(pdf_content))
 
+    if cache_key is not None:
+        # The requester is served from memory; the file only feeds later hits
+        with span("cache_store"):
+            await run_blocking(get_report_cache().put, cache_key, pdf_content)
+    await stage_runs.record(request_id_var.get(), report_key, run)
+    yield "report", {"report": await run_blocking(make_report, pdf_content), "cached": False, "run": run}
 
+
+async def _agenerate_report(threat : str , threat_data : Dict , html_renderer : Optional[str] , output_format : str) -> Tuple[Optional[Report], Dict] :
+    report, run = None, {}
+    async for event, data in astream_report(threat, threat_data, html_renderer, output_format):
+        if event == "report":
+            report, run = data["report"], data["run"]
+    return report, run
+
+
+async def agenerate_report(
+    threat : str ,
+    threat_data : Dict ,
+    html_renderer : Optional[str] = None ,
+    output_format : str = DEFAULT_FORMAT ,
+) -> Optional[Report] : 
+    """Generate a report in `output_format` ("markdown", "json", "html" or
+    "pdf"); concurrent identical requests share one generation."""
+    try : 
+        html_renderer = html_renderer or settings.HTML_RENDERER
+        report_key = await _areport_key(threat, threat_data, html_renderer, output_format)
+        (report, run), shared = await report_flights.do(
+            report_key,
+            lambda: _agenerate_report(threat, threat_data, html_renderer, output_format),
+        )
+        if not shared:
+            return report
+        await stage_runs.record(request_id_var.get(), report_key, {**run, "coalesced": True})
+        # Each request owns its handle: a spilled file is removed once sent
+        return report.clone() if report is not None else None
+
+
+    except RateLimitExceeded :
+        raise
+    except Exception as e :
+        logger.error(f"Error occured in service_report_generator.generate_report : {e}")
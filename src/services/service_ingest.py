@@ -0,0 +1,278 @@
+import io
+import json
+import math
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_crewai.compaction import FEATURE_BASELINES, FEATURE_LABELS
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+# Columns of UNSW-NB15 exports that label a flow rather than describe it
+THREAT_COLUMN = "attack_cat"
+LABEL_COLUMN = "label"
+ID_COLUMN = "id"
+# Categorical features that, with the threat label, define a cluster
+CLUSTER_COLUMNS = ("proto", "service", "state")
+# Numeric flow features summarized per cluster. They are coerced whatever
+# dtype pandas inferred for a chunk: one stray string must not drop a
+# column from that chunk only
+NUMERIC_FEATURES = tuple(column for column in FEATURE_LABELS if column not in CLUSTER_COLUMNS)
+# Numeric anomaly indicators, scored by their |log10| ratio to the normal
+# traffic baseline (a flow ten times above or below it scores 1 per column)
+ANOMALY_INDICATORS = ("rate", "sload", "sbytes")
+# Added to the score by connection state: flows that never complete a
+# handshake (INT, REQ) are typical of scans and floods
+STATE_SCORES = {"INT": 1.0, "REQ": 1.0, "CON": 0.5, "RST": 0.5, "ECO": 0.5}
+# Per-cluster statistics kept for each numeric feature
+STATS = ("min", "max", "sum", "count")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """"csv" or "ndjson" from an upload's file name or content type, None if neither."""
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")) or "json" in content_type:
+        return "ndjson"
+    return None
+
+
+def iter_chunks(file: BinaryIO, file_format: str, chunk_rows: int) -> Iterator["pd.DataFrame"]:
+    """Read a CSV or NDJSON file `chunk_rows` rows at a time.
+
+    Raises:
+        ValueError: when an NDJSON line is not a JSON object
+    """
+    # Imported on first use, ingestion is not on the startup path
+    import pandas as pd
+
+    if file_format == "csv":
+        with pd.read_csv(file, chunksize=chunk_rows) as reader:
+            yield from reader
+        return
+    records = []
+    for number, line in enumerate(io.TextIOWrapper(file, encoding="utf-8"), start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"line {number} is not a JSON object")
+        records.append(record)
+        if len(records) == chunk_rows:
+            yield pd.DataFrame.from_records(records)
+            records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def anomaly_scores(chunk: "pd.DataFrame") -> "np.ndarray":
+    """Vectorized anomaly score of every row of a chunk."""
+    import numpy as np
+    import pandas as pd
+
+    baseline = FEATURE_BASELINES["normal"]
+    scores = np.zeros(len(chunk))
+    for column in ANOMALY_INDICATORS:
+        if column in chunk:
+            values = np.abs(pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=np.float64))
+            # A missing or unparsable value says nothing about the flow
+            terms = np.abs(np.log10((values + 1) / (abs(baseline[column]) + 1)))
+            scores += np.where(np.isnan(values), 0.0, terms)
+    if "state" in chunk:
+        scores += chunk["state"].astype(str).str.strip().map(STATE_SCORES).fillna(0).to_numpy()
+    return scores
+
+
+class ThreatCluster:
+    """Flows sharing a threat label, protocol, service and state."""
+
+    def __init__(self, threat: str, key: Dict[str, str], flows: int, max_score: float, mean_score: float,
+                 threat_data: Dict[str, Any]):
+        self.threat = threat
+        self.key = key
+        self.flows = flows
+        self.max_score = max_score
+        self.mean_score = mean_score
+        self.threat_data = threat_data
+
+    @property
+    def name(self) -> str:
+        return " ".join([self.threat, *(value for value in self.key.values() if value != "-")])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "threat": self.threat,
+            "flows": self.flows,
+            "max_score": round(self.max_score, 3),
+            "mean_score": round(self.mean_score, 3),
+            "threat_data": self.threat_data,
+        }
+
+
+class FlowTriage:
+    """Streaming aggregation of flow chunks into scored threat clusters.
+
+    Only per-cluster statistics are kept (flow count, anomaly scores and the
+    min/max/sum/count of every numeric feature), so memory depends on the
+    number of distinct clusters, capped at `max_clusters`, not on the number
+    of rows. When over the cap, the clusters with the lowest top score are
+    dropped.
+    """
+
+    def __init__(self, default_threat: str, max_clusters: int):
+        self.default_threat = default_threat
+        self.max_clusters = max_clusters
+        self.rows = 0
+        self.benign = 0
+        self.dropped_flows = 0
+        self._clusters: Optional["pd.DataFrame"] = None
+
+    def add(self, chunk: "pd.DataFrame"):
+        import pandas as pd
+
+        self.rows += len(chunk)
+        if THREAT_COLUMN in chunk:
+            threats = chunk[THREAT_COLUMN].fillna("").astype(str).str.strip()
+            threats = threats.mask(threats == "", self.default_threat)
+        else:
+            threats = pd.Series(self.default_threat, index=chunk.index)
+        benign = threats.str.lower() == "normal"
+        if LABEL_COLUMN in chunk:
+            benign |= pd.to_numeric(chunk[LABEL_COLUMN], errors="coerce").fillna(1).eq(0)
+        self.benign += int(benign.sum())
+
+        keys = {"threat": threats}
+        for column in CLUSTER_COLUMNS:
+            keys[column] = chunk[column].fillna("-").astype(str).str.strip() if column in chunk else "-"
+        features = [column for column in NUMERIC_FEATURES if column in chunk]
+        numeric = chunk[features].apply(pd.to_numeric, errors="coerce")
+        frame = numeric.assign(_score=anomaly_scores(chunk), **keys)[~benign.to_numpy()]
+        if frame.empty:
+            return
+
+        grouped = frame.groupby(list(keys), sort=False)
+        statistics = {stat: grouped[features].agg(stat) for stat in STATS} if features else {}
+        partial = pd.concat(
+            {
+                "flows": grouped.size().to_frame("flows"),
+                "score_max": grouped["_score"].max().to_frame("score_max"),
+                "score_sum": grouped["_score"].sum().to_frame("score_sum"),
+                **statistics,
+            },
+            axis=1,
+        )
+        self._merge(partial)
+
+    def _merge(self, partial: "pd.DataFrame"):
+        import pandas as pd
+
+        if self._clusters is not None:
+            combined = pd.concat([self._clusters, partial])
+            grouped = combined.groupby(level=list(range(combined.index.nlevels)), sort=False)
+            partial = grouped.agg({
+                column: "max" if column[0] in ("max", "score_max") else "min" if column[0] == "min" else "sum"
+                for column in combined.columns
+            })
+        if len(partial) > self.max_clusters:
+            partial = partial.sort_values(("score_max", "score_max"), ascending=False)
+            self.dropped_flows += int(partial[("flows", "flows")].iloc[self.max_clusters:].sum())
+            partial = partial.iloc[:self.max_clusters]
+        self._clusters = partial
+
+    @property
+    def cluster_count(self) -> int:
+        return 0 if self._clusters is None else len(self._clusters)
+
+    def top(self, k: int) -> List[ThreatCluster]:
+        """The `k` clusters with the highest top anomaly score (then the most
+        flows). Clusters scoring 0 (no anomaly indicator) are never reported."""
+        if self._clusters is None:
+            return []
+        scored = self._clusters[self._clusters[("score_max", "score_max")] > 0]
+        ranked = scored.sort_values(
+            [("score_max", "score_max"), ("flows", "flows")], ascending=False
+        ).head(k)
+        # Empty when the export has no numeric feature column
+        features = [feature for stat, feature in ranked.columns if stat == "count"]
+        clusters = []
+        for index, row in ranked.iterrows():
+            threat, *values = index
+            key = dict(zip(CLUSTER_COLUMNS, values))
+            flows = int(row[("flows", "flows")])
+            threat_data: Dict[str, Any] = {"flow_count": flows}
+            threat_data.update({column: value for column, value in key.items() if value != "-"})
+            for feature in features:
+                count = row[("count", feature)]
+                if not count:
+                    continue
+                threat_data[feature] = {
+                    "min": _rounded(row[("min", feature)]),
+                    "max": _rounded(row[("max", feature)]),
+                    "mean": _rounded(row[("sum", feature)] / count),
+                }
+            clusters.append(ThreatCluster(
+                threat=threat,
+                key=key,
+                flows=flows,
+                max_score=float(row[("score_max", "score_max")]),
+                mean_score=float(row[("score_sum", "score_sum")]) / flows,
+                threat_data=threat_data,
+            ))
+        return clusters
+
+
+def _rounded(value: float) -> float:
+    value = float(value)
+    return round(value, 6) if math.isfinite(value) else 0.0
+
+
+class TriageResult:
+    def __init__(self, triage: FlowTriage, clusters: List[ThreatCluster], seconds: float):
+        self.rows = triage.rows
+        self.benign = triage.benign
+        self.cluster_count = triage.cluster_count
+        self.dropped_flows = triage.dropped_flows
+        self.clusters = clusters
+        self.seconds = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "benign": self.benign,
+            "clusters": self.cluster_count,
+            "dropped_flows": self.dropped_flows,
+            "seconds": round(self.seconds, 3),
+            "top": [cluster.to_dict() for cluster in self.clusters],
+        }
+
+
+def triage_flows(
+    file: BinaryIO,
+    file_format: str,
+    top_k: int,
+    default_threat: str = "Unknown",
+    chunk_rows: int = settings.INGEST_CHUNK_ROWS,
+    max_clusters: int = settings.INGEST_MAX_CLUSTERS,
+) -> TriageResult:
+    """Stream a flow export, score every row and keep the `top_k` clusters.
+
+    Rows labelled normal (`attack_cat` "Normal" or `label` 0) are counted and
+    skipped; rows without a label get `default_threat`.
+
+    Blocking (file I/O, pandas), call through `run_blocking` from async code.
+    """
+    start = time.perf_counter()
+    triage = FlowTriage(default_threat, max_clusters)
+    for chunk in iter_chunks(file, file_format, chunk_rows):
+        triage.add(chunk)
+    result = TriageResult(triage, triage.top(top_k), time.perf_counter() - start)
+    logger.info(
+        "Triaged %d flows in %.2fs : %d benign, %d clusters, top %d kept",
+        result.rows, result.seconds, result.benign, result.cluster_count, len(result.clusters),
+    )
+    return result
@@ -0,0 +1,276 @@
+import asyncio
+import time
+import uuid
+from typing import Dict, Any, Optional
+from src.config.settings import get_settings
+from src.logger.logger import get_logger, request_id_var
+from src.services.service_generator import agenerate_report
+from src.services.service_report import Report, file_backed
+from src.services.service_ratelimit import RateLimitExceeded
+from src.services.service_deadline import Deadline, RequestAbandoned
+from src.services.service_metrics import metrics
+from src.services.service_executor import run_blocking
+from src.services.service_state import StateBackend, state_backend
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+JOBS_NAMESPACE = "jobs"
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """State of a single background report generation."""
+
+    def __init__(self, threat: str, threat_data: Dict[str, Any], deadline_seconds: Optional[float] = None, **options):
+        self.id = str(uuid.uuid4())
+        self.threat = threat
+        self.threat_data = threat_data
+        self.options = options
+        self.status = "queued"
+        self.created_at = time.time()
+        # Counted from submission: time spent queued is part of the budget
+        self.deadline_at = None if deadline_seconds is None else self.created_at + deadline_seconds
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Report] = None
+        self.error: Optional[str] = None
+        # Log lines of the run carry the id of the request that submitted it
+        self.request_id = request_id_var.get()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "threat": self.threat,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "deadline_at": self.deadline_at,
+            "error": self.error,
+            "request_id": self.request_id,
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """What other workers see of the job, see `from_record`."""
+        record = self.to_dict()
+        if self.result is not None:
+            record.update(result_path=self.result.path, media_type=self.result.media_type)
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Job":
+        """Read-only view of a job run by another worker; its report, if any, is
+        backed by a file that worker owns."""
+        job = cls.__new__(cls)
+        job.id = record["job_id"]
+        job.threat = record["threat"]
+        job.threat_data = {}
+        job.options = {}
+        job.status = record["status"]
+        job.created_at = record["created_at"]
+        job.started_at = record["started_at"]
+        job.finished_at = record["finished_at"]
+        job.deadline_at = record.get("deadline_at")
+        job.error = record["error"]
+        job.request_id = record["request_id"]
+        job.result = None
+        if record.get("result_path") is not None:
+            job.result = Report(path=record["result_path"], media_type=record["media_type"])
+        return job
+
+
+class JobQueue:
+    """Bounded queue of report jobs drained by a fixed pool of asyncio workers.
+
+    `submit` never waits: when the queue is full it raises `JobQueueFullError`
+    so the caller can shed load instead of holding the connection open.
+
+    Finished jobs are kept for `result_ttl` seconds, pruned every
+    `prune_interval`. At most `memory_bytes` of their results stay in memory,
+    the rest are spilled to disk.
+
+    Jobs run in the worker process that accepted them. With a shared state
+    backend their records are published to it, so any worker can report
+    their status and serve their PDF.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        workers: int,
+        result_ttl: int,
+        backend: StateBackend,
+        memory_bytes: int = settings.JOB_RESULT_MEMORY_BYTES,
+        prune_interval: float = settings.JOB_PRUNE_INTERVAL_SECONDS,
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.backend = backend
+        self.memory_bytes = memory_bytes
+        self.prune_interval = prune_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: Dict[str, Job] = {}
+        self._worker_tasks = []
+        # Bytes of the results held in memory (not spilled)
+        self._retained_bytes = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(n)) for n in range(self.workers)
+        ]
+        self._worker_tasks.append(asyncio.create_task(self._prune_periodically()))
+        logger.info(f"Job queue started with {self.workers} workers (max depth {self.maxsize})")
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        logger.info("Job queue stopped")
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(
+        self, threat: str, threat_data: Dict[str, Any], deadline_seconds: Optional[float] = None, **options
+    ) -> Job:
+        """Queue a report; `options` are forwarded to `agenerate_report`.
+
+        A job still queued when its `deadline_seconds` have passed is failed
+        without running, a running one is cancelled.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        await self._prune()
+        job = Job(threat, threat_data, deadline_seconds, **options)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue is full ({self.maxsize} pending jobs)")
+        self._jobs[job.id] = job
+        await self._publish(job)
+        return job
+
+    async def add_completed(self, threat: str, threat_data: Dict[str, Any], result: Report) -> Job:
+        """Record a report generated outside the queue so it can be downloaded by id."""
+        await self._prune()
+        job = Job(threat, threat_data)
+        job.status = "succeeded"
+        job.started_at = job.finished_at = time.time()
+        job.result = await self._retain(result)
+        self._jobs[job.id] = job
+        await self._publish(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self.backend.shared:
+            record = await self.backend.aget(JOBS_NAMESPACE, job_id)
+            if record is not None:
+                job = Job.from_record(record)
+        return job
+
+    async def _publish(self, job: Job):
+        if self.backend.shared:
+            await self.backend.aset(JOBS_NAMESPACE, job.id, job.to_record(), ttl=self.result_ttl)
+
+    async def _retain(self, result: Optional[Report]) -> Optional[Report]:
+        """The result as kept until the job expires.
+
+        Results held in memory are only visible to this process; with a shared
+        backend, or once `memory_bytes` are held, they are written to a spill
+        file (which other workers can read).
+        """
+        if result is None or result.content is None:
+            return result
+        if not self.backend.shared and self._retained_bytes + result.size <= self.memory_bytes:
+            self._retained_bytes += result.size
+            return result
+        return await run_blocking(file_backed, result)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        request_id_var.set(job.request_id)
+        job.status = "running"
+        job.started_at = time.time()
+        await self._publish(job)
+        try:
+            if job.deadline_at is not None and job.deadline_at <= job.started_at:
+                # Expired while queued: the whole pipeline is skipped
+                metrics.requests_abandoned.inc(reason="deadline")
+                raise RequestAbandoned("deadline")
+            report = agenerate_report(job.threat, job.threat_data, **job.options)
+            if job.deadline_at is not None:
+                report = Deadline(job.deadline_at - job.started_at).run(report)
+            job.result = await self._retain(await report)
+            if job.result is None:
+                job.status = "failed"
+                job.error = "Failed to generate report"
+            else:
+                job.status = "succeeded"
+        except RateLimitExceeded as e:
+            logger.warning("Job %s shed : %s", job.id, e)
+            job.status = "failed"
+            job.error = f"LLM provider is at capacity, retry after {e.retry_after:.0f}s"
+        except RequestAbandoned:
+            logger.warning("Job %s passed its deadline", job.id)
+            job.status = "failed"
+            job.error = "Deadline exceeded"
+        except Exception as e:
+            logger.error(f"Error occured in service_jobs job {job.id} : {e}")
+            job.status = "failed"
+            job.error = "Failed to generate report"
+        finally:
+            job.finished_at = time.time()
+            await self._publish(job)
+
+    async def _prune(self):
+        """Forget finished jobs older than the configured retention."""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if job.result is not None:
+                if job.result.content is not None:
+                    self._retained_bytes -= job.result.size
+                job.result.cleanup()
+        if self.backend.shared:
+            await self.backend.apurge()
+
+    async def _prune_periodically(self):
+        # Also covers workers that only record streamed reports, never `submit`
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                await self._prune()
+            except Exception as e:
+                logger.error(f"Error occured in service_jobs prune : {e}")
+
+
+job_queue = JobQueue(
+    maxsize=settings.JOB_QUEUE_MAXSIZE,
+    workers=settings.JOB_WORKERS,
+    result_ttl=settings.JOB_RESULT_TTL_SECONDS,
+    backend=state_backend,
+)
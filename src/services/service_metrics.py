@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.config.settings import get_settings
+from src.logger.logger import get_logger, request_id_var
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+METRICS_NAMESPACE = "metrics"
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List:
+        """JSON-serializable values, see `render`."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def render(self, snapshots: Iterable[List] = ()) -> List[str]:
+        """Exposition lines of this process' values plus `snapshots` of other workers."""
+        with self._lock:
+            values = dict(self._values)
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                key = tuple(key)
+                values[key] = values.get(key, 0.0) + value
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, the last one for +Inf, sum)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> List:
+        """JSON-serializable series, see `render`."""
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._series.items()]
+
+    def render(self, snapshots: Iterable[List] = ()) -> List[str]:
+        """Exposition lines of this process' series plus `snapshots` of other workers."""
+        with self._lock:
+            series = {key: [list(counts), total] for key, (counts, total) in self._series.items()}
+        for snapshot in snapshots:
+            for key, counts, total in snapshot:
+                merged = series.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Process-wide Prometheus metrics, rendered in the text exposition format."""
+
+    def __init__(self):
+        self.http_request_seconds = Histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+        )
+        self.stage_seconds = Histogram(
+            "report_stage_duration_seconds", "Duration of one report pipeline stage", ("stage", "status")
+        )
+        self.llm_queue_wait_seconds = Histogram(
+            "llm_queue_wait_seconds", "Time LLM calls waited for rate limit budget", ("stage",)
+        )
+        self.llm_tokens = Histogram(
+            "llm_call_tokens", "Estimated tokens (prompt and completion) per LLM stage", ("stage",), TOKEN_BUCKETS
+        )
+        self.cache_lookups = Counter("report_cache_lookups_total", "Report cache lookups", ("result",))
+        self.singleflight_calls = Counter(
+            "report_singleflight_calls_total", "Report generations started (leader) or joined (coalesced)", ("role",)
+        )
+        self.requests_abandoned = Counter(
+            "report_requests_abandoned_total", "Report requests cancelled before completion", ("reason",)
+        )
+        self.stages_abandoned = Counter(
+            "report_stages_abandoned_total",
+            "Stages of abandoned reports that were never started, or interrupted while running",
+            ("stage", "state"),
+        )
+        self.llm_tokens_saved = Counter(
+            "llm_tokens_saved_total", "Estimated LLM tokens not spent because their report was abandoned"
+        )
+
+    def _all(self) -> Tuple:
+        return (self.http_request_seconds, self.stage_seconds, self.llm_queue_wait_seconds,
+                self.llm_tokens, self.cache_lookups, self.singleflight_calls,
+                self.requests_abandoned, self.stages_abandoned, self.llm_tokens_saved)
+
+    def snapshot(self) -> Dict[str, List]:
+        """This process' metrics by name, as published for the other workers."""
+        return {metric.name: metric.snapshot() for metric in self._all()}
+
+    def render(self, workers: Iterable[Dict[str, List]] = ()) -> str:
+        """This process' metrics summed with the `snapshot()`s of other workers."""
+        workers = list(workers)
+        lines = []
+        for metric in self._all():
+            lines.extend(metric.render(worker.get(metric.name, []) for worker in workers))
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+async def apublish_metrics(backend: Any):
+    """Publish this worker's metrics to a shared state backend; they expire
+    if the worker stops publishing (it exited)."""
+    await backend.aset(
+        METRICS_NAMESPACE, str(os.getpid()), metrics.snapshot(), ttl=settings.METRICS_PUBLISH_SECONDS * 3
+    )
+
+
+async def arender_metrics(backend: Any) -> str:
+    """/metrics of the whole server: with a shared state backend the
+    answering worker adds the latest metrics published by the others, so a
+    scrape does not depend on which worker serves it."""
+    if not backend.shared:
+        return metrics.render()
+    await apublish_metrics(backend)
+    published = await backend.aitems(METRICS_NAMESPACE)
+    pid = str(os.getpid())
+    return metrics.render(snapshot for worker, snapshot in published.items() if worker != pid)
+
+
+async def run_metrics_publisher(backend: Any):
+    """Background task of each worker, see `apublish_metrics`."""
+    while True:
+        try:
+            await apublish_metrics(backend)
+        except Exception as e:
+            logger.error(f"Error occured in service_metrics.run_metrics_publisher : {e}")
+        await asyncio.sleep(settings.METRICS_PUBLISH_SECONDS)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """Timing span around one pipeline stage.
+
+    Attributes set on the span (`tokens`, `queue_wait`, `cache`, ...) are
+    logged with its duration when it closes and feed the matching metrics.
+    """
+
+    def __init__(self, stage: str, attributes: Dict):
+        self.stage = stage
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, name: str, amount: float):
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        # Restored by value rather than with a reset token: spans may close in
+        # another context when they wrap the yields of an async generator
+        self._parent = _current_span.get()
+        _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.set(self._parent)
+        if exc_type is None:
+            status = "ok"
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            status = "cancelled"
+        else:
+            status = "error"
+        metrics.stage_seconds.observe(duration, stage=self.stage, status=status)
+        if "tokens" in self.attributes:
+            metrics.llm_tokens.observe(self.attributes["tokens"], stage=self.stage)
+        if "queue_wait" in self.attributes:
+            metrics.llm_queue_wait_seconds.observe(self.attributes["queue_wait"], stage=self.stage)
+        if "cache" in self.attributes:
+            metrics.cache_lookups.inc(result=self.attributes["cache"])
+        if logger.isEnabledFor(logging.INFO):
+            # Attributes are copied: with the log queue the line is formatted on another thread
+            logger.info(
+                "span stage=%s status=%s duration_ms=%.1f%s",
+                self.stage, status, duration * 1000, _SpanAttributes(dict(self.attributes)),
+                extra={"fields": {"stage": self.stage, "status": status, "duration_ms": round(duration * 1000, 1), **self.attributes}},
+            )
+        return False
+
+
+class _SpanAttributes:
+    """` name=value` pairs of a span, joined only if its log line is emitted."""
+
+    __slots__ = ("attributes",)
+
+    def __init__(self, attributes: Dict[str, Any]):
+        self.attributes = attributes
+
+    def __str__(self) -> str:
+        return "".join(f" {name}={value}" for name, value in self.attributes.items())
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def add(self, name: str, amount: float):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str, **attributes):
+    """Time a block as `stage`; a shared no-op when `METRICS_ENABLED` is off."""
+    if not settings.METRICS_ENABLED:
+        return _NOOP_SPAN
+    return Span(stage, attributes)
+
+
+def current_span():
+    """The innermost open span of this task, for callees to annotate."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+# Accepted form of a client's own `X-Request-ID`, echoed back for correlation
+_CLIENT_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each HTTP request an id and timing it.
+
+    The id is generated here, never taken from the client: it is the key of the
+    request's run record (`/generator/runs/{request_id}`), so a client must not
+    be able to pick another one's. It is returned in `X-Request-ID` and tags
+    every log line of the request. A client's own `X-Request-ID` (letters,
+    digits, `.`, `_` and `-`, up to 64) is echoed back in `X-Client-Request-ID`
+    and logged next to it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        response_headers = [(b"x-request-id", request_id.encode("latin-1"))]
+        client_request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        if _CLIENT_REQUEST_ID.fullmatch(client_request_id):
+            response_headers.append((b"x-client-request-id", client_request_id.encode("latin-1")))
+            logger.info("Client request id %s", client_request_id)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + response_headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if settings.METRICS_ENABLED:
+                # Route template, not the raw path, to keep the label set small
+                route = getattr(scope.get("route"), "path", "unmatched")
+                metrics.http_request_seconds.observe(
+                    time.perf_counter() - start, method=scope["method"], route=route, status=status
+                )
+            request_id_var.reset(token)
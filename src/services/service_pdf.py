@@ -0,0 +1,206 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_crewai.utils import html_to_pdf, report_to_pdf_bytes
+from src.services.service_executor import run_blocking
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+
+class PdfBackend:
+    """Renders a finished report to PDF bytes.
+
+    Backends receive both the HTML page and the markdown it was built from, so
+    renderers that cannot lay out HTML (FPDF) still have something to work with.
+    """
+
+    name = "base"
+
+    def start(self):
+        """Acquire long-lived resources; called at application startup."""
+
+    def stop(self):
+        """Release what `start` acquired; called at application shutdown."""
+
+    def render(self, html_text: str, md_text: str) -> bytes:
+        """Blocking render, returns the PDF document."""
+        raise NotImplementedError
+
+    async def arender(self, html_text: str, md_text: str) -> bytes:
+        return await run_blocking(self.render, html_text, md_text)
+
+
+class WkhtmltopdfBackend(PdfBackend):
+    """pdfkit/wkhtmltopdf, one process per report.
+
+    Concurrent renders are capped at `PDF_POOL_WORKERS` so a burst of reports
+    cannot fork an unbounded number of wkhtmltopdf processes.
+    """
+
+    name = "wkhtmltopdf"
+
+    def __init__(self, wkhtmltopdf_path: Optional[str], max_concurrency: int):
+        self.wkhtmltopdf_path = wkhtmltopdf_path
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def render(self, html_text: str, md_text: str) -> bytes:
+        with self._slots:
+            return html_to_pdf(html_text, False, self.wkhtmltopdf_path)
+
+
+def _pool_worker_init():
+    """Load WeasyPrint once per worker process and warm its font/CSS caches."""
+    global _weasyprint_html
+    from weasyprint import HTML
+    _weasyprint_html = HTML
+    HTML(string="<html><body><p>warm-up</p></body></html>").write_pdf()
+
+
+def _deny_url_fetcher(url: str, *args, **kwargs):
+    """WeasyPrint URL fetcher that only resolves inline `data:` URLs.
+
+    The page is built from LLM output: an `<img>` or stylesheet pointing at
+    `file://` or an internal host must not be fetched into the PDF. The
+    report template embeds everything it needs.
+    """
+    if url.startswith("data:"):
+        from weasyprint.urls import default_url_fetcher
+        return default_url_fetcher(url, *args, **kwargs)
+    raise ValueError(f"External resource blocked: {url[:100]}")
+
+
+def _pool_render(html_text: str) -> bytes:
+    return _weasyprint_html(string=html_text, url_fetcher=_deny_url_fetcher).write_pdf()
+
+
+def _pool_ping() -> bool:
+    return True
+
+
+class PooledWeasyPrintBackend(PdfBackend):
+    """WeasyPrint running in a pool of persistent worker processes.
+
+    The engine is imported and warmed up once per worker at startup, so each
+    report only pays for layout, not for process creation or module loading.
+    Workers come from a forkserver: forking the API process directly would
+    copy it mid-flight, with its threads (blocking pool, log queue) and
+    whatever locks they held.
+    """
+
+    name = "pool"
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Bumped on each restart from `arender`, so concurrent renders that
+        # saw the same broken pool replace it only once
+        self._generation = 0
+        self._restart_lock = asyncio.Lock()
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_pool_worker_init,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        # Spawn every worker now rather than on the first reports
+        for future in [self._pool.submit(_pool_ping) for _ in range(self.workers)]:
+            future.result()
+        logger.info(f"PDF render pool started with {self.workers} workers")
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def render(self, html_text: str, md_text: str) -> bytes:
+        if self._pool is None:
+            self.start()
+        return self._pool.submit(_pool_render, html_text).result()
+
+    async def _arestart(self, generation: int):
+        """(Re)start the pool, unless it was replaced since `generation`."""
+        async with self._restart_lock:
+            if self._generation != generation:
+                return
+            self.stop()
+            await run_blocking(self.start)
+            self._generation += 1
+
+    async def arender(self, html_text: str, md_text: str) -> bytes:
+        if self._pool is None:
+            await self._arestart(self._generation)
+        loop = asyncio.get_running_loop()
+        generation = self._generation
+        try:
+            return await loop.run_in_executor(self._pool, _pool_render, html_text)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in a native lib), rebuild the pool once
+            logger.warning("PDF render pool is broken, restarting it")
+            await self._arestart(generation)
+            return await loop.run_in_executor(self._pool, _pool_render, html_text)
+
+
+class FpdfBackend(PdfBackend):
+    """Pure-Python fallback: lays out the markdown with FPDF, ignores the HTML theme."""
+
+    name = "fpdf"
+
+    def render(self, html_text: str, md_text: str) -> bytes:
+        return report_to_pdf_bytes(md_text)
+
+
+_pdf_backend: Optional[PdfBackend] = None
+_pdf_backend_started = False
+_pdf_backend_lock = threading.Lock()
+
+
+def get_pdf_backend() -> PdfBackend:
+    """Return the process-wide PDF backend selected by `settings.PDF_BACKEND`."""
+    global _pdf_backend
+    if _pdf_backend is None:
+        if settings.PDF_BACKEND == WkhtmltopdfBackend.name:
+            _pdf_backend = WkhtmltopdfBackend(settings.WKHTMLTOPDF_PATH, settings.PDF_POOL_WORKERS)
+        elif settings.PDF_BACKEND == PooledWeasyPrintBackend.name:
+            _pdf_backend = PooledWeasyPrintBackend(settings.PDF_POOL_WORKERS)
+        else:
+            _pdf_backend = FpdfBackend()
+    return _pdf_backend
+
+
+def start_pdf_backend() -> PdfBackend:
+    """Start the configured backend, falling back to FPDF if it cannot start
+    (e.g. WeasyPrint's native libraries are missing). Idempotent."""
+    global _pdf_backend, _pdf_backend_started
+    with _pdf_backend_lock:
+        if _pdf_backend_started:
+            return _pdf_backend
+        backend = get_pdf_backend()
+        try:
+            backend.start()
+        except Exception as e:
+            logger.error(f"PDF backend {backend.name} failed to start, falling back to fpdf : {e}")
+            backend.stop()
+            _pdf_backend = FpdfBackend()
+        _pdf_backend_started = True
+        return _pdf_backend
+
+
+async def astarted_pdf_backend() -> PdfBackend:
+    """The running backend, started by the first report unless warmed up at startup."""
+    if _pdf_backend_started:
+        return _pdf_backend
+    return await run_blocking(start_pdf_backend)
+
+
+def stop_pdf_backend():
+    global _pdf_backend_started
+    if _pdf_backend is not None:
+        _pdf_backend.stop()
+    _pdf_backend_started = False
@@ -0,0 +1,236 @@
+import asyncio
+import random
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_metrics import current_span
+from src.services.service_state import StateBackend, state_backend
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+T = TypeVar("T")
+
+WINDOW_SECONDS = 60.0
+RATE_LIMIT_NAMESPACE = "ratelimit"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of queueing a call whose projected wait is too long."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"LLM rate limit for {model} exceeded, retry after {retry_after:.0f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+def estimate_tokens(*texts: Optional[str], completion_tokens: int = 0) -> int:
+    """Rough token count (~4 characters per token) of a prompt plus its expected completion."""
+    return sum(len(text) for text in texts if text) // 4 + completion_tokens
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code
+
+
+def _retry_after_header(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ModelLimiter:
+    """Sliding-window requests-per-minute and tokens-per-minute budget for one model.
+
+    Callers reserve an admission time instead of polling: each reservation is
+    the earliest instant at which the call fits in both budgets, never earlier
+    than the previous reservation, so queued calls are admitted in order. The
+    admission log lives in the state backend, so with a shared backend the
+    budget holds across all workers.
+    """
+
+    def __init__(self, model: str, rpm: int, tpm: int, backend: StateBackend):
+        if rpm <= 0 or tpm <= 0:
+            raise ValueError(f"Rate limits of {model} must be positive, got rpm={rpm} tpm={tpm}")
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.backend = backend
+
+    def _admit_time(self, admissions: list, tokens: int, now: float) -> float:
+        """`admissions` is a list of [admit time, tokens] with non-decreasing
+        times; entries that left the window are dropped from it."""
+        while admissions and admissions[0][0] <= now - WINDOW_SECONDS:
+            admissions.pop(0)
+        candidate = max(now, admissions[-1][0]) if admissions else now
+        while True:
+            window = [entry for entry in admissions if entry[0] > candidate - WINDOW_SECONDS]
+            used_tokens = sum(entry_tokens for _, entry_tokens in window)
+            if len(window) < self.rpm and used_tokens + tokens <= self.tpm:
+                return candidate
+            candidate = window[0][0] + WINDOW_SECONDS
+
+    async def projected_wait(self, calls: List[int]) -> float:
+        """Seconds until the last of `calls` (token estimates, in order) would
+        be admitted if they were all reserved now; nothing is reserved."""
+        now = time.time()
+        admissions = await self.backend.aget(RATE_LIMIT_NAMESPACE, self.model) or []
+        admit_at = now
+        for tokens in calls:
+            tokens = min(tokens, self.tpm)
+            admit_at = self._admit_time(admissions, tokens, now)
+            admissions.append([admit_at, tokens])
+        return admit_at - now
+
+    async def _reserve(self, tokens: int, max_wait: float) -> float:
+        def reserve(admissions):
+            admissions = admissions or []
+            now = time.time()
+            wait = self._admit_time(admissions, tokens, now) - now
+            if wait <= max_wait:
+                admissions.append([now + wait, tokens])
+            return admissions, (now + wait, wait)
+
+        return await self.backend.aupdate(RATE_LIMIT_NAMESPACE, self.model, reserve)
+
+    async def _release(self, admit_at: float, tokens: int):
+        """Give back a reservation whose call will not be made."""
+        def release(admissions):
+            admissions = admissions or []
+            if [admit_at, tokens] in admissions:
+                admissions.remove([admit_at, tokens])
+            return admissions, None
+
+        await self.backend.aupdate(RATE_LIMIT_NAMESPACE, self.model, release)
+
+    async def acquire(self, tokens: int, max_wait: float):
+        """Wait for budget for a call of `tokens` tokens.
+
+        Raises:
+            RateLimitExceeded: when the call could not start within `max_wait`
+        """
+        tokens = min(tokens, self.tpm)
+        admit_at, wait = await self._reserve(tokens, max_wait)
+        if wait > max_wait:
+            raise RateLimitExceeded(self.model, wait)
+        if wait > 0:
+            logger.info("Queueing %s call for %.1fs (%d tokens)", self.model, wait, tokens)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The report was abandoned while queued: free the slot for others
+                await self._release(admit_at, tokens)
+                raise
+
+
+class LLMScheduler:
+    """Client-side scheduler every LLM call goes through.
+
+    Calls are admitted against per-model RPM/TPM budgets, retried with
+    jittered exponential backoff on 429 and 5xx responses, and rejected early
+    with `RateLimitExceeded` when they could not start within
+    `LLM_MAX_QUEUE_WAIT_SECONDS`.
+    """
+
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+        # A zero or negative budget is a configuration error, caught at startup
+        for model, limits in {"default": {}, **settings.LLM_RATE_LIMITS}.items():
+            rpm = limits.get("rpm", settings.LLM_DEFAULT_RPM)
+            tpm = limits.get("tpm", settings.LLM_DEFAULT_TPM)
+            if rpm <= 0 or tpm <= 0:
+                raise ValueError(f"Rate limits of {model} must be positive, got rpm={rpm} tpm={tpm}")
+
+    def limiter(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limits = settings.LLM_RATE_LIMITS.get(model, {})
+            limiter = ModelLimiter(
+                model,
+                rpm=limits.get("rpm", settings.LLM_DEFAULT_RPM),
+                tpm=limits.get("tpm", settings.LLM_DEFAULT_TPM),
+                backend=state_backend,
+            )
+            self._limiters[model] = limiter
+        return limiter
+
+    def _backoff(self, model: str, attempt: int, error: Exception, deadline: float) -> float:
+        """Delay before retry `attempt`, or raise if the error is not worth retrying."""
+        status_code = _status_code(error)
+        if status_code not in RETRYABLE_STATUS_CODES:
+            raise error
+        delay = random.uniform(0, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+        delay = max(delay, _retry_after_header(error) or 0)
+        if attempt >= settings.LLM_MAX_RETRIES or time.monotonic() + delay > deadline:
+            # Still throttled by the provider: tell the client when to come back
+            if status_code == 429:
+                raise RateLimitExceeded(model, max(delay, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt)) from error
+            raise error
+        logger.warning("%s call failed with %s, retry %d in %.1fs", model, status_code, attempt + 1, delay)
+        current_span().add("retries", 1)
+        return delay
+
+    async def check_capacity(self, calls: Dict[str, List[int]]):
+        """Reject a whole pipeline up front: `calls` maps each model to the
+        token estimates of the calls it will make, in order.
+
+        Raises:
+            RateLimitExceeded: when the last call of a model could not start
+                within `LLM_MAX_QUEUE_WAIT_SECONDS`, so no call is paid for
+                only to shed the request at a later stage
+        """
+        for model, tokens in calls.items():
+            if not tokens:
+                continue
+            wait = await self.limiter(model).projected_wait(tokens)
+            if wait > settings.LLM_MAX_QUEUE_WAIT_SECONDS:
+                raise RateLimitExceeded(model, wait)
+
+    async def _acquire(self, model: str, tokens: int, deadline: float):
+        start = time.perf_counter()
+        await self.limiter(model).acquire(tokens, deadline - time.monotonic())
+        current_span().add("queue_wait", round(time.perf_counter() - start, 4))
+
+    async def call(self, model: str, tokens: int, func: Callable[[], Awaitable[T]]) -> T:
+        """Run `func()` (one LLM call) under the model's budget, retrying transient errors."""
+        deadline = time.monotonic() + settings.LLM_MAX_QUEUE_WAIT_SECONDS
+        attempt = 0
+        while True:
+            await self._acquire(model, tokens, deadline)
+            try:
+                return await func()
+            except Exception as e:
+                delay = self._backoff(model, attempt, e, deadline)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def stream(self, model: str, tokens: int, func: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Like `call` for a streamed completion; only retried before the first chunk."""
+        deadline = time.monotonic() + settings.LLM_MAX_QUEUE_WAIT_SECONDS
+        attempt = 0
+        while True:
+            await self._acquire(model, tokens, deadline)
+            started = False
+            try:
+                async with aclosing(func()) as chunks:
+                    async for chunk in chunks:
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._backoff(model, attempt, e, deadline)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+llm_scheduler = LLMScheduler()
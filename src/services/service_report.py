@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+from fastapi.responses import FileResponse, Response
+from starlette.background import BackgroundTask
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+
+class Report:
+    """A rendered report, either held in memory or backed by a file.
+
+    File-backed reports are either cached (owned by the report cache, never
+    deleted here) or `temporary` spills that `cleanup` removes.
+    """
+
+    def __init__(
+        self,
+        content: Optional[bytes] = None,
+        path: Optional[str] = None,
+        media_type: str = "application/pdf",
+        temporary: bool = False,
+    ):
+        if (content is None) == (path is None):
+            raise ValueError("A report needs exactly one of content or path")
+        self.content = content
+        self.path = path
+        self.media_type = media_type
+        self.temporary = temporary
+
+    @property
+    def size(self) -> int:
+        if self.content is not None:
+            return len(self.content)
+        return os.path.getsize(self.path)
+
+    def read(self) -> bytes:
+        if self.content is not None:
+            return self.content
+        with open(self.path, "rb") as report_file:
+            return report_file.read()
+
+    def clone(self) -> "Report":
+        """Independent handle on the same report, for serving one result to several requests.
+
+        A temporary spill is hard-linked (copied if links are unsupported) so
+        each handle can be cleaned up on its own.
+        """
+        if not self.temporary:
+            return Report(content=self.content, path=self.path, media_type=self.media_type)
+        fd, path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".spill")
+        os.close(fd)
+        os.remove(path)
+        try:
+            os.link(self.path, path)
+        except OSError:
+            shutil.copyfile(self.path, path)
+        return Report(path=path, media_type=self.media_type, temporary=True)
+
+    def cleanup(self):
+        """Delete the backing file of a temporary spill; no-op otherwise."""
+        if self.temporary and self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def to_response(self, filename: str, cleanup: bool = True) -> Response:
+        """Build a download response; `cleanup` drops a spill once it is sent."""
+        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+        background = BackgroundTask(self.cleanup) if cleanup and self.temporary else None
+        if self.path is not None:
+            return FileResponse(
+                self.path,
+                media_type=self.media_type,
+                headers=headers,
+                background=background,
+            )
+        return Response(
+            self.content,
+            media_type=self.media_type,
+            headers=headers,
+            background=background,
+        )
+
+
+def make_report(content: bytes, media_type: str = "application/pdf") -> Report:
+    """Wrap rendered bytes, spilling them to disk past the configured size.
+
+    Blocking when it spills (file I/O), call through `run_blocking` from async code.
+    """
+    if not settings.REPORT_SPILL_ENABLED or len(content) <= settings.REPORT_SPILL_THRESHOLD_BYTES:
+        return Report(content=content, media_type=media_type)
+    return _spill(content, media_type)
+
+
+def _spill(content: bytes, media_type: str) -> Report:
+    os.makedirs(settings.REPORT_SPILL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=settings.REPORT_SPILL_DIR, suffix=".spill")
+    with os.fdopen(fd, "wb") as spill_file:
+        spill_file.write(content)
+    logger.info("Spilled %d byte report to %s", len(content), path)
+    return Report(path=path, media_type=media_type, temporary=True)
+
+
+def file_backed(report: Report) -> Report:
+    """The report itself if it has a file, else a temporary spill of it, so
+    other worker processes can serve it.
+
+    Blocking when it spills (file I/O), call through `run_blocking` from async code.
+    """
+    if report.path is not None:
+        return report
+    return _spill(report.content, report.media_type)
+
+
+def cleanup_spill_dir(max_age_seconds: int):
+    """Remove spills left behind by a previous run (crash, restart)."""
+    if not os.path.isdir(settings.REPORT_SPILL_DIR):
+        return
+    cutoff = time.time() - max_age_seconds
+    for entry in os.scandir(settings.REPORT_SPILL_DIR):
+        if entry.name.endswith(".spill") and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,129 @@
+import queue
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, Optional
+import httpx
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_executor import run_blocking
+
+if TYPE_CHECKING:
+    # crewai, langchain and groq take seconds to import: loaded by the first
+    # request that needs them, or by `warm_up`
+    from groq import AsyncGroq
+    from langchain_groq import ChatGroq
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+
+class AppResources:
+    """Application-scoped clients and agents, shared by every request.
+
+    Created at FastAPI startup and closed at shutdown. Holds the pooled
+    keep-alive HTTP clients used by Groq and ChatGroq, one ChatGroq per model,
+    and a pool of prebuilt agent sets per model, so a request only has to
+    build its Task objects. The Groq clients and agents are built on first
+    use; `warm_up` builds them ahead of the first request.
+    """
+
+    def __init__(self):
+        self.http_client: Optional[httpx.Client] = None
+        self.async_http_client: Optional[httpx.AsyncClient] = None
+        self._async_groq: Optional["AsyncGroq"] = None
+        self._llms: Dict[str, "ChatGroq"] = {}
+        self._agent_pools: Dict[str, "queue.SimpleQueue"] = {}
+
+    def start(self):
+        start = time.perf_counter()
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        )
+        timeout = httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.async_http_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        logger.info(f"App resources ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def warm_up(self):
+        """Import the LLM stack and prebuild one agent set, so the first request does not pay for it.
+
+        Blocking, call through `run_blocking` from async code.
+        """
+        start = time.perf_counter()
+        self.async_groq  # builds the client
+        if self._agent_pools.get(settings.MODEL) is None or self._agent_pools[settings.MODEL].empty():
+            self._release_agents(settings.MODEL, self._build_agents(settings.MODEL))
+        logger.info(f"App resources warmed up in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    @property
+    def async_groq(self) -> "AsyncGroq":
+        if self._async_groq is None:
+            from groq import AsyncGroq
+
+            self._async_groq = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=settings.GROQ_BASE_URL,
+                http_client=self.async_http_client,
+            )
+        return self._async_groq
+
+    async def aclose(self):
+        start = time.perf_counter()
+        self._agent_pools.clear()
+        self._llms.clear()
+        if self.async_http_client is not None:
+            await self.async_http_client.aclose()
+        if self.http_client is not None:
+            self.http_client.close()
+        self.http_client = self.async_http_client = self._async_groq = None
+        logger.info(f"App resources closed in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def get_llm(self, model: str) -> "ChatGroq":
+        from langchain_groq import ChatGroq
+
+        llm = self._llms.get(model)
+        if llm is None:
+            llm = ChatGroq(
+                temperature=0,
+                groq_api_key=settings.GROQ_API_KEY,
+                groq_api_base=settings.GROQ_BASE_URL,
+                model_name=model,
+                http_client=self.http_client,
+            )
+            self._llms[model] = llm
+        return llm
+
+    def _build_agents(self, model: str) -> Dict:
+        from crewai import Crew
+        from src.services.service_crewai.agents import create_agents
+
+        agents = create_agents(self.get_llm(model))
+        # Binds the crew-level handlers (cache, RPM) to the agents, as before
+        Crew(agents=list(agents.values()), verbose=2)
+        return agents
+
+    def _release_agents(self, model: str, agents: Dict):
+        pool = self._agent_pools.setdefault(model, queue.SimpleQueue())
+        if pool.qsize() < settings.AGENT_POOL_SIZE:
+            pool.put(agents)
+
+    @asynccontextmanager
+    async def agents(self, model: str):
+        """Check out an agent set for one request.
+
+        Agents keep per-execution state, so a set is never shared by two
+        requests at once; the pool grows on demand and keeps at most
+        `AGENT_POOL_SIZE` idle sets per model.
+        """
+        try:
+            agents = self._agent_pools.setdefault(model, queue.SimpleQueue()).get_nowait()
+        except queue.Empty:
+            agents = await run_blocking(self._build_agents, model)
+        try:
+            yield agents
+        finally:
+            self._release_agents(model, agents)
+
+
+resources = AppResources()
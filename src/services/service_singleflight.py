@@ -0,0 +1,75 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+from src.logger.logger import get_logger
+from src.services.service_metrics import metrics
+
+logger = get_logger(__file__)
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts `func()` as its own task; callers that
+    arrive while it runs wait on the same task and get the same result (or
+    exception). A caller being cancelled does not cancel the shared work
+    unless it was the last one waiting for it.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Run or join the call for `key`.
+
+        Returns:
+            (result, shared): `shared` is True for callers that joined a call
+            started by another one
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+            metrics.singleflight_calls.inc(role="coalesced")
+            logger.info("Joining in-flight report %.12s (%d waiting)", key, flight.waiters)
+        else:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+            metrics.singleflight_calls.inc(role="leader")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                # Its cleanup has run by the time the caller sees the cancellation
+                await asyncio.gather(flight.task, return_exceptions=True)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
+
+
+report_flights = SingleFlight()
@@ -0,0 +1,263 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from src.config.settings import get_settings
+from src.logger.logger import get_logger
+from src.services.service_executor import run_blocking
+
+settings = get_settings()
+logger = get_logger(__file__)
+
+T = TypeVar("T")
+
+
+class StateBackend:
+    """Key/value store for the state the app workers share: job records, run
+    records and rate-limit admissions.
+
+    Values are JSON-serializable, grouped by `namespace` and optionally
+    expire after `ttl` seconds. `update` is the one atomic primitive: the
+    rate limiter reads, extends and writes its admission log in one step. A
+    Redis implementation maps `get`/`set`/`delete` onto GET/SET EX/DEL of
+    `<namespace>:<key>` and `update` onto a WATCH/MULTI retry loop (or a Lua
+    script).
+
+    Coroutines use the `a*` counterparts, which run the calls of a
+    `blocking` backend (disk, network) in the blocking pool so a busy
+    database never stalls the event loop.
+    """
+
+    name = "base"
+    # True when other processes see the same state
+    shared = False
+    blocking = True
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def update(
+        self,
+        namespace: str,
+        key: str,
+        func: Callable[[Optional[Any]], Tuple[Any, T]],
+        ttl: Optional[float] = None,
+    ) -> T:
+        """Atomically replace the value of `key` with `func(value)[0]`.
+
+        Returns:
+            `func(value)[1]`
+        """
+        raise NotImplementedError
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        """Every live key of `namespace` with its value."""
+        raise NotImplementedError
+
+    def purge(self):
+        """Drop expired entries."""
+
+    def close(self):
+        """Release connections; called at application shutdown."""
+
+    async def _acall(self, func: Callable[..., T], *args, **kwargs) -> T:
+        if not self.blocking:
+            return func(*args, **kwargs)
+        return await run_blocking(func, *args, **kwargs)
+
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        return await self._acall(self.get, namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        await self._acall(self.set, namespace, key, value, ttl)
+
+    async def adelete(self, namespace: str, key: str):
+        await self._acall(self.delete, namespace, key)
+
+    async def aupdate(
+        self,
+        namespace: str,
+        key: str,
+        func: Callable[[Optional[Any]], Tuple[Any, T]],
+        ttl: Optional[float] = None,
+    ) -> T:
+        return await self._acall(self.update, namespace, key, func, ttl)
+
+    async def aitems(self, namespace: str) -> Dict[str, Any]:
+        return await self._acall(self.items, namespace)
+
+    async def apurge(self):
+        await self._acall(self.purge)
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local state, for a single worker."""
+
+    name = "memory"
+    # A dict behind a lock, cheap enough to call from the event loop
+    blocking = False
+
+    def __init__(self):
+        self._values: Dict[Tuple[str, str], Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self._values.get((namespace, key))
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._values[(namespace, key)]
+            return None
+        return value
+
+    def _store(self, namespace: str, key: str, value: Any, ttl: Optional[float]):
+        self._values[(namespace, key)] = (value, time.time() + ttl if ttl is not None else None)
+
+    def get(self, namespace, key):
+        with self._lock:
+            return self._live(namespace, key)
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            self._store(namespace, key, value, ttl)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._values.pop((namespace, key), None)
+
+    def update(self, namespace, key, func, ttl=None):
+        with self._lock:
+            value, result = func(self._live(namespace, key))
+            self._store(namespace, key, value, ttl)
+            return result
+
+    def items(self, namespace):
+        with self._lock:
+            keys = [key for (entry_namespace, key) in self._values if entry_namespace == namespace]
+            return {key: value for key in keys if (value := self._live(namespace, key)) is not None}
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._values.items() if expires_at is not None and expires_at <= now]
+            for k in expired:
+                del self._values[k]
+
+
+class SQLiteStateBackend(StateBackend):
+    """State in a SQLite database (WAL mode) that every worker on the host opens.
+
+    Each thread of each process has its own connection; `update` runs in a
+    `BEGIN IMMEDIATE` transaction so concurrent writers are serialized by
+    SQLite's lock.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit; update() opens its own transaction
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return connection
+
+    def _select(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._connection.execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _upsert(self, namespace: str, key: str, value: Any, ttl: Optional[float]):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl if ttl is not None else None),
+        )
+
+    def get(self, namespace, key):
+        return self._select(namespace, key)
+
+    def set(self, namespace, key, value, ttl=None):
+        self._upsert(namespace, key, value, ttl)
+
+    def delete(self, namespace, key):
+        self._connection.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def update(self, namespace, key, func, ttl=None):
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            value, result = func(self._select(namespace, key))
+            self._upsert(namespace, key, value, ttl)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def items(self, namespace):
+        rows = self._connection.execute(
+            "SELECT key, value FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time()),
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def purge(self):
+        self._connection.execute(
+            "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def create_state_backend() -> StateBackend:
+    """The configured backend; by default process memory for one worker and
+    SQLite when `WORKERS` starts several."""
+    name = settings.STATE_BACKEND or ("sqlite" if settings.WORKERS > 1 else "memory")
+    if name == "sqlite":
+        return SQLiteStateBackend(settings.STATE_SQLITE_PATH)
+    if settings.WORKERS > 1:
+        logger.warning(f"STATE_BACKEND=memory with {settings.WORKERS} workers, jobs and rate limits are per worker")
+    return MemoryStateBackend()
+
+
+state_backend = create_state_backend()
@@ -0,0 +1,119 @@
+"""Concurrency benchmark for `agenerate_report`.
+
+The real pipeline stages are replaced by stand-ins that block (or await) for a
+fixed time, so the numbers only reflect how the service schedules its stages:
+with the blocking work off the event loop, N concurrent reports should take
+about as long as the slowest one, not N times as long, and the loop should
+stay responsive while they run. The stand-in tasks follow the real
+`TASK_GRAPHS` shape of the threat, so a single report takes about its
+critical path (longest dependency chain) times `TASK_SECONDS`.
+
+Usage:
+    [PARALLEL_MITIGATION=true] python tests/benchmark_concurrency.py [num_requests] [threat]
+"""
+import asyncio
+import sys
+import time
+
+import src.services.service_generator as service_generator
+from src.services.service_crewai.tasks import TASK_GRAPHS, task_graph_for
+from src.services.service_pdf import PdfBackend
+
+TASK_SECONDS = 1.0 / 3
+HTML_SECONDS = 0.5
+PDF_SECONDS = 0.3
+
+
+class FakeAgent:
+    backstory = ""
+
+
+class FakeTask:
+    description = "Analyze the detected threat"
+    expected_output = "A report"
+    agent = FakeAgent()
+
+    def execute(self, context=None):
+        time.sleep(TASK_SECONDS)
+        return "## Report"
+
+
+def fake_create_tasks(agents, threat, threat_data):
+    graph = TASK_GRAPHS[task_graph_for(threat)]
+    return {name: (FakeTask(), deps) for name, deps in graph.items()}
+
+
+def critical_path(graph) -> int:
+    """Number of tasks on the longest dependency chain of a task graph."""
+    depth = {}
+
+    def visit(name):
+        if name not in depth:
+            depth[name] = 1 + max((visit(dep) for dep in graph[name]), default=0)
+        return depth[name]
+
+    return max(visit(name) for name in graph)
+
+
+async def fake_astream_html_report(data, client):
+    await asyncio.sleep(HTML_SECONDS)
+    yield "<html></html>"
+
+
+class FakePdfBackend(PdfBackend):
+    def render(self, html_text, md_text):
+        time.sleep(PDF_SECONDS)
+        return b"%PDF-"
+
+
+async def fake_started_pdf_backend():
+    return FakePdfBackend()
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst event-loop lag observed while `stop` is unset."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_benchmark(num_requests: int, threat: str):
+    service_generator.settings.REPORT_CACHE_ENABLED = False
+    service_generator.settings.STAGE_CACHE_ENABLED = False
+    service_generator.create_tasks = fake_create_tasks
+    service_generator.astream_html_report = fake_astream_html_report
+    service_generator.astarted_pdf_backend = fake_started_pdf_backend
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(heartbeat(stop))
+
+    start = time.perf_counter()
+    await service_generator.agenerate_report(threat, {"sbytes": 200})
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        service_generator.agenerate_report(threat, {"sbytes": 200})
+        for _ in range(num_requests)
+    ])
+    concurrent = time.perf_counter() - start
+
+    stop.set()
+    worst_lag = await lag_task
+
+    graph = TASK_GRAPHS[task_graph_for(threat)]
+    print(f"Task graph             : {task_graph_for(threat)}, {len(graph)} LLM calls, "
+          f"{critical_path(graph)} on the critical path ({TASK_SECONDS:.2f} s each)")
+    print(f"Single report          : {single:.2f} s")
+    print(f"{num_requests} concurrent reports : {concurrent:.2f} s "
+          f"(sequential would be {single * num_requests:.2f} s)")
+    print(f"Worst event loop lag   : {worst_lag * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    threat = sys.argv[2] if len(sys.argv) > 2 else "Backdoor"
+    asyncio.run(run_benchmark(num_requests, threat))
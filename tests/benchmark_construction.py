@@ -0,0 +1,70 @@
+"""Per-request construction cost: fresh clients and agents vs shared resources.
+
+"before" rebuilds what every request used to build (Groq client, ChatGroq,
+three Agents, Crew, Tasks); "after" checks an agent set out of the
+application-scoped `AppResources` and only builds the Tasks. No LLM call is
+made, so no network access is needed.
+
+Usage:
+    python tests/benchmark_construction.py [iterations]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from crewai import Crew
+from langchain_groq import ChatGroq
+
+from src.config.settings import get_settings
+from src.services.service_crewai.agents import create_agents
+from src.services.service_crewai.tasks import create_tasks
+from src.services.service_crewai.utils import get_async_groq_client
+from src.services.service_resources import AppResources
+
+THREAT = "Backdoor"
+THREAT_DATA = {"proto": "ddp", "state": "INT", "sbytes": 200, "rate": 111111.109375}
+
+
+def build_per_request(settings):
+    get_async_groq_client()
+    llm = ChatGroq(temperature=0, groq_api_key=settings.GROQ_API_KEY, model_name=settings.MODEL)
+    agents = create_agents(llm)
+    graph = create_tasks(agents, THREAT, THREAT_DATA)
+    Crew(agents=list(agents.values()), tasks=[task for task, _ in graph.values()], verbose=2)
+
+
+async def build_with_resources(resources, settings):
+    async with resources.agents(settings.MODEL) as agents:
+        create_tasks(agents, THREAT, THREAT_DATA)
+
+
+async def run_benchmark(iterations: int):
+    settings = get_settings()
+
+    before = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        build_per_request(settings)
+        before.append(time.perf_counter() - start)
+
+    resources = AppResources()
+    start = time.perf_counter()
+    resources.start()
+    resources.warm_up()
+    startup = time.perf_counter() - start
+    after = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await build_with_resources(resources, settings)
+        after.append(time.perf_counter() - start)
+    await resources.aclose()
+
+    print(f"before : median {statistics.median(before) * 1000:.2f} ms per request")
+    print(f"after  : median {statistics.median(after) * 1000:.2f} ms per request "
+          f"(one-off startup {startup * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    asyncio.run(run_benchmark(iterations))
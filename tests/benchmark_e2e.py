@@ -0,0 +1,187 @@
+"""End-to-end benchmark of the service against a local mock LLM server.
+
+Starts the mock Groq API (`tests/mock_llm_server.py`) and the FastAPI app in
+this process, replays threat rows through `/generator/generate-report/stream`
+at a fixed concurrency, and writes latency percentiles, throughput and the
+time at which each stage completed to a JSON file, so runs can be compared
+across commits. Nothing leaves the machine.
+
+The threat label is taken from the row file name (`Backdoor_Row.json` is
+replayed as `Backdoor`). The report and stage caches are disabled and the
+rate limits are raised unless `--keep-limits` is given, so the numbers
+measure the pipeline.
+
+Usage:
+    PYTHONPATH=. python tests/benchmark_e2e.py [--requests 20] [--concurrency 4]
+        [--latency 0.5] [--tokens-per-second 250] [--error-rate 0.0]
+        [--pdf-backend fpdf] [--output .cache/benchmarks/e2e.json]
+        [rows ...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from mock_llm_server import (
+    BackgroundServer,
+    add_config_arguments,
+    config_from_arguments,
+    create_app,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_ROWS = [ROOT / "Samples" / "Sample Input" / "Backdoor_Row.json"]
+PERCENTILES = (50, 95, 99)
+
+
+def load_rows(paths):
+    rows = []
+    for path in paths:
+        data = json.loads(Path(path).read_text())
+        threat = Path(path).stem.split("_")[0]
+        for row in data if isinstance(data, list) else [data]:
+            rows.append({"threat": threat, "threat_data": row})
+    return rows
+
+
+def summarize(values):
+    if not values:
+        return None
+    summary = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary.update(mean=float(np.mean(values)), max=float(np.max(values)), count=len(values))
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def replay_one(client: httpx.AsyncClient, payload: dict) -> dict:
+    """Stream one report; returns its latency and when each stage completed."""
+    start = time.perf_counter()
+    result = {"ok": False, "stages": {}}
+    event = None
+    async with client.stream("POST", "/generator/generate-report/stream", json=payload) as response:
+        if response.status_code != 200:
+            result["error"] = f"HTTP {response.status_code}"
+            return result
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                elapsed = time.perf_counter() - start
+                if event == "stage":
+                    result["stages"][data["stage"]] = elapsed
+                elif event == "done":
+                    result["ok"] = True
+                    result["latency"] = elapsed
+                elif event == "error":
+                    result["error"] = data.get("detail", "error")
+    return result
+
+
+async def replay(base_url: str, rows, num_requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(i):
+        async with semaphore:
+            return await replay_one(client, rows[i % len(rows)])
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[run(i) for i in range(num_requests)])
+        wall = time.perf_counter() - start
+    return results, wall
+
+
+def configure_service(args, llm_base_url: str):
+    # Settings are read once, on first import of the app
+    os.environ.setdefault("GROQ_API_KEY", "mock")
+    os.environ.setdefault("MODEL", "llama3-70b-8192")
+    os.environ["GROQ_BASE_URL"] = llm_base_url
+    os.environ["REPORT_CACHE_ENABLED"] = "false"
+    os.environ["STAGE_CACHE_ENABLED"] = "false"
+    os.environ["PDF_BACKEND"] = args.pdf_backend
+    if not args.keep_limits:
+        os.environ["LLM_DEFAULT_RPM"] = "1000000"
+        os.environ["LLM_DEFAULT_TPM"] = "1000000000"
+
+
+def run_benchmark(args):
+    rows = load_rows(args.rows or DEFAULT_ROWS)
+    llm_config = config_from_arguments(args)
+
+    with BackgroundServer(create_app(llm_config)) as llm_server:
+        configure_service(args, llm_server.base_url)
+        sys.path.insert(0, str(ROOT))
+        from app import app
+
+        with BackgroundServer(app) as app_server:
+            results, wall = asyncio.run(replay(app_server.base_url, rows, args.requests, args.concurrency))
+        llm_stats = httpx.get(f"{llm_server.base_url}/stats").json()
+
+    succeeded = [r for r in results if r["ok"]]
+    stage_names = sorted({stage for r in succeeded for stage in r["stages"]})
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r.get("error", "unknown")] = errors.get(r.get("error", "unknown"), 0) + 1
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rows": [str(p) for p in (args.rows or DEFAULT_ROWS)],
+            "pdf_backend": args.pdf_backend,
+            "keep_limits": args.keep_limits,
+            "mock_llm": llm_config.to_dict(),
+        },
+        "wall_seconds": wall,
+        "throughput_rps": len(succeeded) / wall if wall else 0.0,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "errors": errors,
+        "latency_seconds": summarize([r["latency"] for r in succeeded]),
+        # Seconds from request start until each stage's SSE event arrived
+        "stage_completed_seconds": {
+            name: summarize([r["stages"][name] for r in succeeded if name in r["stages"]])
+            for name in stage_names
+        },
+        "llm": llm_stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=Path, help="threat row JSON files (object or array)")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pdf-backend", default="fpdf", choices=["pool", "wkhtmltopdf", "fpdf"])
+    parser.add_argument("--keep-limits", action="store_true", help="keep the configured LLM rate limits")
+    parser.add_argument("--output", type=Path, default=ROOT / ".cache" / "benchmarks" / "e2e.json")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    summary = run_benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(summary, indent=2))
+    latency = summary["latency_seconds"] or {}
+    print(f"{summary['succeeded']}/{args.requests} succeeded, {summary['throughput_rps']:.2f} reports/s, "
+          f"p50 {latency.get('p50', float('nan')):.2f} s, p95 {latency.get('p95', float('nan')):.2f} s, "
+          f"p99 {latency.get('p99', float('nan')):.2f} s")
+    print(f"Results written to {args.output}")
@@ -0,0 +1,105 @@
+"""Latency of each output format of `/generator/generate-report`.
+
+Runs the app in-process against the local mock Groq API
+(`tests/mock_llm_server.py`) and requests the same rows as markdown, JSON,
+HTML and PDF, so the cost of the HTML conversion and the PDF render shows up
+as the difference between formats. The report and stage caches are disabled
+and the rate limits raised (see `tests/benchmark_e2e.py`).
+
+Usage:
+    PYTHONPATH=. python tests/benchmark_formats.py [--requests 10] [--concurrency 2]
+        [--formats markdown json html pdf] [--html-renderer template]
+        [--latency 0.5] [--pdf-backend fpdf] [--output .cache/benchmarks/formats.json] [rows ...]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmark_e2e import DEFAULT_ROWS, configure_service, git_commit, load_rows, summarize
+from mock_llm_server import BackgroundServer, add_config_arguments, config_from_arguments, create_app
+
+ROOT = Path(__file__).resolve().parent.parent
+FORMATS = ("markdown", "json", "html", "pdf")
+
+
+async def request_format(base_url: str, rows, output_format: str, html_renderer: str,
+                         num_requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(i):
+        payload = {**rows[i % len(rows)], "html_renderer": html_renderer}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/generator/generate-report", params={"format": output_format}, json=payload
+            )
+            return response.status_code, len(response.content), time.perf_counter() - start
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        return await asyncio.gather(*[run(i) for i in range(num_requests)])
+
+
+def run_benchmark(args):
+    rows = load_rows(args.rows or DEFAULT_ROWS)
+    llm_config = config_from_arguments(args)
+    results = {}
+
+    with BackgroundServer(create_app(llm_config)) as llm_server:
+        args.keep_limits = False
+        configure_service(args, llm_server.base_url)
+        sys.path.insert(0, str(ROOT))
+        from app import app
+
+        with BackgroundServer(app) as app_server:
+            for output_format in args.formats:
+                responses = asyncio.run(request_format(
+                    app_server.base_url, rows, output_format, args.html_renderer,
+                    args.requests, args.concurrency,
+                ))
+                succeeded = [r for r in responses if r[0] == 200]
+                results[output_format] = {
+                    "succeeded": len(succeeded),
+                    "failed": len(responses) - len(succeeded),
+                    "bytes": summarize([r[1] for r in succeeded]),
+                    "latency_seconds": summarize([r[2] for r in succeeded]),
+                }
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "html_renderer": args.html_renderer,
+            "pdf_backend": args.pdf_backend,
+            "mock_llm": llm_config.to_dict(),
+        },
+        "formats": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=Path, help="threat row JSON files (object or array)")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--html-renderer", default="template", choices=["template", "llm"])
+    parser.add_argument("--pdf-backend", default="fpdf", choices=["pool", "wkhtmltopdf", "fpdf"])
+    parser.add_argument("--output", type=Path, default=ROOT / ".cache" / "benchmarks" / "formats.json")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    summary = run_benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(summary, indent=2))
+    for output_format, result in summary["formats"].items():
+        latency = result["latency_seconds"] or {}
+        print(f"{output_format:<8}: {result['succeeded']}/{args.requests} succeeded, "
+              f"p50 {latency.get('p50', float('nan')):.3f} s, p95 {latency.get('p95', float('nan')):.3f} s")
+    print(f"Results written to {args.output}")
@@ -0,0 +1,88 @@
+"""Latency of the two HTML rendering paths for a finished report.
+
+`template` renders the markdown locally with markdown2 and the Jinja template,
+`llm` sends the report back to Groq for conversion (needs GROQ_API_KEY and
+network access; skipped otherwise).
+
+Usage:
+    python tests/benchmark_html_render.py [iterations]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from src.services.service_crewai.utils import (
+    agenerate_html_report,
+    get_async_groq_client,
+    load_report_template,
+    render_html_report,
+)
+
+SAMPLE_REPORT = """# Cybersecurity Incident Report: Backdoor
+
+## 1. Executive Summary
+A **Backdoor** was detected on a `ddp` flow in state `INT`: 2 source packets,
+200 source bytes and a source load of 88,888,888 bit/s over 9 microseconds.
+
+## 2. Threat Analysis
+| Indicator | Value | Observation |
+| --------- | ----- | ----------- |
+| rate | 111111.11 | Far above the baseline for this service |
+| sload | 88888888.0 | Burst consistent with a command channel beacon |
+| sbytes | 200 | Small, fixed-size payload |
+
+## 3. Impact Assessment
+- **Confidentiality:** high, remote access to the host
+- **Integrity:** high, attacker can alter files and configuration
+- **Availability:** medium
+
+## 4. Mitigation Strategy
+### Short term
+1. Isolate the source host from the network.
+2. Block the flow's destination at the perimeter firewall.
+
+### Long term
+1. Deploy EDR on all endpoints.
+2. Review outbound filtering rules.
+
+## 5. Conclusions
+The indicators match a backdoor beacon and require immediate containment.
+"""
+
+
+def bench_template(iterations: int):
+    start = time.perf_counter()
+    load_report_template()
+    print(f"template : compiled in {(time.perf_counter() - start) * 1000:.2f} ms")
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render_html_report(SAMPLE_REPORT, "Backdoor")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_llm(iterations: int):
+    client = get_async_groq_client()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await agenerate_html_report(SAMPLE_REPORT, client)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings):
+    print(f"{name:<9}: median {statistics.median(timings) * 1000:.2f} ms, "
+          f"max {max(timings) * 1000:.2f} ms over {len(timings)} runs")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    report("template", bench_template(iterations))
+    if os.getenv("GROQ_API_KEY"):
+        report("llm", asyncio.run(bench_llm(min(iterations, 5))))
+    else:
+        print("llm      : skipped, GROQ_API_KEY is not set")
@@ -0,0 +1,123 @@
+"""Bulk ingestion benchmark: triage throughput and peak memory against file size.
+
+Writes synthetic UNSW-NB15-style CSV exports of each size (mostly normal
+traffic plus a few attack categories), then triages every file in a fresh
+Python process and reports rows per second and the process' peak RSS. With
+chunked reading the peak should not grow with the file.
+
+Usage:
+    PYTHONPATH=. python tests/benchmark_ingest.py [--rows 100000 400000 1600000]
+        [--chunk-rows 20000] [--top-k 5]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+COLUMNS = ["id", "dur", "proto", "service", "state", "spkts", "dpkts", "sbytes", "dbytes", "rate",
+           "sttl", "dttl", "sload", "dload", "sinpkt", "smean", "dmean", "ct_srv_src",
+           "ct_src_dport_ltm", "attack_cat", "label"]
+PROTOS = np.array(["tcp", "udp", "arp", "ospf", "sctp"])
+SERVICES = np.array(["-", "http", "dns", "ftp", "smtp", "ssh"])
+STATES = np.array(["FIN", "INT", "CON", "REQ", "RST"])
+ATTACKS = np.array(["Normal", "Generic", "Exploits", "Fuzzers", "DoS", "Reconnaissance", "Backdoor"])
+ATTACK_WEIGHTS = np.array([0.7, 0.1, 0.07, 0.05, 0.04, 0.03, 0.01])
+WRITE_CHUNK_ROWS = 100000
+
+
+def write_export(path: str, num_rows: int, seed: int = 0):
+    """Synthetic flow export, written chunk by chunk."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as export:
+        export.write(",".join(COLUMNS) + "\n")
+        for start in range(0, num_rows, WRITE_CHUNK_ROWS):
+            n = min(WRITE_CHUNK_ROWS, num_rows - start)
+            attacks = rng.choice(ATTACKS, n, p=ATTACK_WEIGHTS)
+            columns = [
+                np.arange(start, start + n),
+                rng.exponential(0.5, n).round(6),
+                rng.choice(PROTOS, n),
+                rng.choice(SERVICES, n),
+                rng.choice(STATES, n),
+                rng.integers(1, 100, n),
+                rng.integers(0, 100, n),
+                rng.lognormal(7, 2, n).astype(int),
+                rng.lognormal(7, 2, n).astype(int),
+                rng.lognormal(4, 3, n).round(3),
+                rng.integers(0, 255, n),
+                rng.integers(0, 255, n),
+                rng.lognormal(10, 3, n).round(1),
+                rng.lognormal(10, 3, n).round(1),
+                rng.exponential(50, n).round(3),
+                rng.integers(20, 1500, n),
+                rng.integers(0, 1500, n),
+                rng.integers(1, 60, n),
+                rng.integers(1, 60, n),
+                attacks,
+                (attacks != "Normal").astype(int),
+            ]
+            lines = (",".join(map(str, row)) for row in zip(*columns))
+            export.write("\n".join(lines) + "\n")
+
+
+def measure(path: str, chunk_rows: int, top_k: int) -> dict:
+    """Run in the child process: triage `path`, return its timing and peak RSS."""
+    from src.services.service_ingest import triage_flows
+
+    import pandas  # noqa: F401  (loaded before the baseline so it is not counted as growth)
+
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    with open(path, "rb") as export:
+        result = triage_flows(export, "csv", top_k, chunk_rows=chunk_rows)
+    seconds = time.perf_counter() - start
+    return {
+        "rows": result.rows,
+        "clusters": result.cluster_count,
+        "seconds": seconds,
+        "rows_per_second": result.rows / seconds,
+        "rss_before_mb": baseline_mb,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_benchmark(args):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for num_rows in args.rows:
+            path = os.path.join(directory, f"flows_{num_rows}.csv")
+            write_export(path, num_rows)
+            size_mb = os.path.getsize(path) / 1024 ** 2
+            env = {**os.environ, "LOG_LEVEL": "WARNING"}
+            env.setdefault("GROQ_API_KEY", "benchmark")
+            env.setdefault("MODEL", "llama3-70b-8192")
+            child = subprocess.run(
+                [sys.executable, __file__, "--measure", path,
+                 "--chunk-rows", str(args.chunk_rows), "--top-k", str(args.top_k)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            result = {"file_mb": size_mb, **json.loads(child.stdout.splitlines()[-1])}
+            results.append(result)
+            print(f"{num_rows:>9,} rows ({size_mb:7.1f} MB): {result['rows_per_second']:>9,.0f} rows/s, "
+                  f"peak RSS {result['peak_rss_mb']:6.1f} MB ({result['rss_before_mb']:.1f} MB before)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 400000, 1600000])
+    parser.add_argument("--chunk-rows", type=int, default=20000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.chunk_rows, args.top_k)))
+    else:
+        run_benchmark(args)
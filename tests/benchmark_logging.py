@@ -0,0 +1,116 @@
+"""Microbenchmark of the logging configurations.
+
+Measures how many records per second the calling thread can emit with:
+- the previous console formatter (color map rebuilt and level name rewritten
+  on every record), written synchronously
+- the current console formatter, synchronously
+- the JSON formatter, synchronously
+- the JSON formatter behind the queue handler (caller-side rate, the listener
+  thread formats and writes)
+and the cost of a filtered-out debug call with an f-string versus lazy
+%-style arguments. Output goes to /dev/null so the terminal is not measured.
+
+Usage:
+    PYTHONPATH=. python tests/benchmark_logging.py [num_records]
+"""
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueListener
+
+from uvicorn.logging import ColourizedFormatter
+
+from src.logger.logger import (
+    CustomColourizedFormatter,
+    DeferredQueueHandler,
+    JsonFormatter,
+    RequestIdFilter,
+)
+
+CONSOLE_FORMAT = "{asctime} | {levelname:<8} | {request_id} | {message}"
+PAYLOAD = {"sbytes": 200, "sload": 88888888.0, "proto": "ddp", "report": "## Report\n" * 200}
+
+
+class LegacyColourizedFormatter(ColourizedFormatter):
+    """The formatter as it was before the production logging mode."""
+
+    def format(self, record):
+        level_color_map = {
+            "DEBUG": "\033[34m",
+            "INFO": "\033[32m",
+            "WARNING": "\033[33m",
+            "ERROR": "\033[31m",
+            "CRITICAL": "\033[41m",
+        }
+        reset = "\033[0m"
+        record.levelname = f"{level_color_map.get(record.levelname, '')}{record.levelname}{reset}"
+        return super().format(record)
+
+
+def make_logger(name, handler, level=logging.DEBUG):
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(level)
+    handler.addFilter(RequestIdFilter())
+    logger.addHandler(handler)
+    return logger
+
+
+def console_formatter(cls):
+    return cls(CONSOLE_FORMAT, style="{", datefmt="%Y-%m-%d %H:%M:%S", use_colors=True)
+
+
+def emit_records(logger, num_records):
+    start = time.perf_counter()
+    for i in range(num_records):
+        logger.info("span stage=%s status=%s duration_ms=%.1f", "analysis", "ok", i * 0.1)
+    return num_records / (time.perf_counter() - start)
+
+
+def run_benchmark(num_records):
+    devnull = open(os.devnull, "w")
+    results = {}
+
+    for label, formatter in (
+        ("console, previous formatter", console_formatter(LegacyColourizedFormatter)),
+        ("console", console_formatter(CustomColourizedFormatter)),
+        ("json", JsonFormatter()),
+    ):
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(formatter)
+        results[label] = emit_records(make_logger(f"bench.{label}", handler), num_records)
+
+    records = queue.SimpleQueue()
+    target = logging.StreamHandler(devnull)
+    target.setFormatter(JsonFormatter())
+    listener = QueueListener(records, target)
+    listener.start()
+    logger = make_logger("bench.queue", DeferredQueueHandler(records))
+    results["json + queue (caller)"] = emit_records(logger, num_records)
+    start = time.perf_counter()
+    listener.stop()
+    drain = time.perf_counter() - start
+
+    for label, rate in results.items():
+        print(f"{label:<30}: {rate:>10,.0f} records/s")
+    print(f"{'queue drain after the run':<30}: {drain * 1000:>10.1f} ms")
+
+    filtered = make_logger("bench.filtered", logging.StreamHandler(devnull), level=logging.INFO)
+    start = time.perf_counter()
+    for _ in range(num_records):
+        filtered.debug(f"Calling generate with {PAYLOAD}")
+    eager = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(num_records):
+        filtered.debug("Calling generate with %s", PAYLOAD)
+    lazy = time.perf_counter() - start
+    print(f"{'filtered debug, f-string':<30}: {eager / num_records * 1e6:>10.2f} us/call")
+    print(f"{'filtered debug, lazy args':<30}: {lazy / num_records * 1e6:>10.2f} us/call")
+
+
+if __name__ == "__main__":
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    run_benchmark(num_records)
@@ -0,0 +1,46 @@
+"""Per-report PDF render time of each PDF backend.
+
+Renders the sample report from `benchmark_html_render` through every backend
+that can start in this environment (`pool` needs WeasyPrint's native libraries,
+`wkhtmltopdf` the binary on PATH or WKHTMLTOPDF_PATH).
+
+Usage:
+    python tests/benchmark_pdf_render.py [iterations]
+"""
+import statistics
+import sys
+import time
+
+from src.config.settings import get_settings
+from src.services.service_crewai.utils import render_html_report
+from src.services.service_pdf import FpdfBackend, PooledWeasyPrintBackend, WkhtmltopdfBackend
+from tests.benchmark_html_render import SAMPLE_REPORT
+
+
+def bench(backend, iterations: int):
+    html_text = render_html_report(SAMPLE_REPORT, "Backdoor")
+    try:
+        start = time.perf_counter()
+        backend.start()
+        startup = time.perf_counter() - start
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend.render(html_text, SAMPLE_REPORT)
+            timings.append(time.perf_counter() - start)
+    except Exception as e:
+        print(f"{backend.name:<12}: skipped ({e})")
+        return
+    finally:
+        backend.stop()
+    print(f"{backend.name:<12}: startup {startup * 1000:.1f} ms, "
+          f"median {statistics.median(timings) * 1000:.1f} ms, "
+          f"max {max(timings) * 1000:.1f} ms over {iterations} runs")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    settings = get_settings()
+    bench(FpdfBackend(), iterations)
+    bench(WkhtmltopdfBackend(settings.WKHTMLTOPDF_PATH, 1), iterations)
+    bench(PooledWeasyPrintBackend(1), iterations)
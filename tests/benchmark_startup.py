@@ -0,0 +1,122 @@
+"""Startup benchmark: time to the first `GET /` response and RSS after boot.
+
+Starts the app with uvicorn in a subprocess a few times, polls `/` until it
+answers, then reads the server's resident memory, and prints the medians.
+
+Both numbers depend on the machine, so no baseline is committed and none is
+compared by default. To gate a change, record a baseline on the machine that
+runs the check (e.g. a CI job, on its base commit) with `--update-baseline`,
+then pass the same `--baseline` file: the script exits with status 1 when
+either median exceeds it by more than the tolerance.
+
+Usage:
+    PYTHONPATH=. python tests/benchmark_startup.py [--runs 3] [--tolerance 0.25]
+        [--baseline .cache/benchmarks/startup_baseline.json] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE_PATH = ROOT / ".cache" / "benchmarks" / "startup_baseline.json"
+TIMEOUT_SECONDS = 60.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    """Resident set size of a running process (Linux /proc)."""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"No VmRSS for process {pid}")
+
+
+def measure_once() -> dict:
+    port = free_port()
+    env = {**os.environ, "STARTUP_WARMUP": "false"}
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    env.setdefault("MODEL", "llama3-70b-8192")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            if time.perf_counter() - start > TIMEOUT_SECONDS:
+                raise RuntimeError("Server did not answer in time")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).status_code == 200:
+                    break
+            except httpx.TransportError:
+                time.sleep(0.01)
+        first_response = time.perf_counter() - start
+        return {"time_to_first_response_seconds": first_response, "rss_mb": rss_mb(server.pid)}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run_benchmark(runs: int) -> dict:
+    samples = [measure_once() for _ in range(runs)]
+    return {
+        name: statistics.median(sample[name] for sample in samples)
+        for name in ("time_to_first_response_seconds", "rss_mb")
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list:
+    return [
+        f"{name}: {result[name]:.3f} > {baseline[name]:.3f} (+{tolerance:.0%})"
+        for name in result
+        if name in baseline and result[name] > baseline[name] * (1 + tolerance)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase")
+    parser.add_argument("--baseline", type=Path, help="compare with this baseline, recorded on the same machine")
+    parser.add_argument("--update-baseline", action="store_true", help="record the result as the baseline")
+    args = parser.parse_args()
+    baseline_path = args.baseline or DEFAULT_BASELINE_PATH
+
+    result = run_benchmark(args.runs)
+    print(f"Time to first response : {result['time_to_first_response_seconds']:.3f} s")
+    print(f"RSS after boot         : {result['rss_mb']:.1f} MB")
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+        sys.exit(0)
+
+    if args.baseline is None:
+        sys.exit(0)
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}, record one with --update-baseline")
+        sys.exit(1)
+    failures = regressions(result, json.loads(baseline_path.read_text()), args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,139 @@
+"""Load test of the multi-worker mode: throughput against the number of workers.
+
+For each worker count, starts `python app.py` with `WORKERS=<n>` and the
+SQLite state backend (so the LLM rate limits are shared, as in production),
+points it at the local mock Groq API (`tests/mock_llm_server.py`), replays
+the same requests as `tests/benchmark_e2e.py` and records throughput and
+latency percentiles. The report and stage caches are disabled and the rate
+limits raised, so every request runs the whole pipeline.
+
+Usage:
+    PYTHONPATH=. python tests/benchmark_workers.py [--workers 1 2 4] [--requests 40]
+        [--concurrency 16] [--latency 0.5] [--pdf-backend fpdf]
+        [--output .cache/benchmarks/workers.json] [rows ...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmark_e2e import DEFAULT_ROWS, git_commit, load_rows, replay, summarize
+from mock_llm_server import (
+    BackgroundServer,
+    add_config_arguments,
+    config_from_arguments,
+    create_app,
+    free_port,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+STARTUP_TIMEOUT_SECONDS = 60.0
+
+
+def start_service(workers: int, port: int, llm_base_url: str, state_dir: str, args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WORKERS": str(workers),
+        "STATE_BACKEND": "sqlite",
+        "STATE_SQLITE_PATH": os.path.join(state_dir, "state.sqlite3"),
+        "GROQ_BASE_URL": llm_base_url,
+        "REPORT_CACHE_ENABLED": "false",
+        "STAGE_CACHE_ENABLED": "false",
+        "PDF_BACKEND": args.pdf_backend,
+        "LLM_DEFAULT_RPM": "1000000",
+        "LLM_DEFAULT_TPM": "1000000000",
+        "LOG_LEVEL": "WARNING",
+    }
+    env.setdefault("GROQ_API_KEY", "mock")
+    env.setdefault("MODEL", "llama3-70b-8192")
+    server = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Service exited with status {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("Service did not answer in time")
+
+
+def run_workers(workers: int, rows, llm_base_url: str, args) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as state_dir:
+        server = start_service(workers, port, llm_base_url, state_dir, args)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            # Warm every worker (imports, agents, PDF backend) before measuring
+            asyncio.run(replay(base_url, rows, workers * 2, workers * 2))
+            results, wall = asyncio.run(replay(base_url, rows, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+
+    succeeded = [r for r in results if r["ok"]]
+    return {
+        "workers": workers,
+        "wall_seconds": wall,
+        "throughput_rps": len(succeeded) / wall if wall else 0.0,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "latency_seconds": summarize([r["latency"] for r in succeeded]),
+    }
+
+
+def run_benchmark(args):
+    rows = load_rows(args.rows or DEFAULT_ROWS)
+    llm_config = config_from_arguments(args)
+    with BackgroundServer(create_app(llm_config)) as llm_server:
+        runs = [run_workers(workers, rows, llm_server.base_url, args) for workers in args.workers]
+
+    baseline = runs[0]["throughput_rps"]
+    for run in runs:
+        run["speedup"] = run["throughput_rps"] / baseline if baseline else None
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rows": [str(p) for p in (args.rows or DEFAULT_ROWS)],
+            "pdf_backend": args.pdf_backend,
+            "mock_llm": llm_config.to_dict(),
+        },
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=Path, help="threat row JSON files (object or array)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pdf-backend", default="fpdf", choices=["pool", "wkhtmltopdf", "fpdf"])
+    parser.add_argument("--output", type=Path, default=ROOT / ".cache" / "benchmarks" / "workers.json")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    summary = run_benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(summary, indent=2))
+    for run in summary["runs"]:
+        latency = run["latency_seconds"] or {}
+        print(f"{run['workers']:>2} workers: {run['succeeded']}/{args.requests} succeeded, "
+              f"{run['throughput_rps']:.2f} reports/s (x{run['speedup'] or 0:.2f}), "
+              f"p50 {latency.get('p50', float('nan')):.2f} s, p95 {latency.get('p95', float('nan')):.2f} s")
+    print(f"Results written to {args.output}")
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Settings are required at import time; the tests never reach the provider
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("MODEL", "test-model")
+os.environ.setdefault("REPORT_CACHE_ENABLED", "false")
+os.environ.setdefault("STAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Scripts run by hand against a live server, not test modules
+collect_ignore = ["stress_test.py"]
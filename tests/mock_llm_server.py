@@ -0,0 +1,193 @@
+"""Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+Answers `POST /openai/v1/chat/completions`, streamed or not, after a
+configurable time to first token and at a configurable token rate, and fails
+a configurable share of the calls, so the service can be benchmarked offline
+without spending provider quota. Point the service at it with
+`GROQ_BASE_URL=http://127.0.0.1:<port>`.
+
+Usage:
+    python tests/mock_llm_server.py [--port 8100] [--latency 0.5]
+        [--tokens-per-second 250] [--completion-tokens 300] [--error-rate 0.0]
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# CrewAI agents parse the ReAct format, so completions end with a final answer
+ANSWER_PREFIX = "Thought: I now know the final answer\nFinal Answer: "
+FILLER_WORDS = ("suspicious", "traffic", "observed", "from", "the", "source", "host", "indicates",
+                "a", "possible", "backdoor", "and", "should", "be", "contained", "immediately.")
+
+
+class MockLLMConfig:
+    def __init__(
+        self,
+        latency: float = 0.5,
+        tokens_per_second: float = 250.0,
+        completion_tokens: int = 300,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _completion_text(tokens: int) -> str:
+    words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(tokens)]
+    lines = [" ".join(words[i:i + 16]) for i in range(0, len(words), 16)]
+    return ANSWER_PREFIX + "## Incident report\n\n" + "\n".join(f"- {line}" for line in lines)
+
+
+def create_app(config: MockLLMConfig) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    rng = random.Random(config.seed)
+    stats = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["calls"] += 1
+        if rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "Mock provider error", "type": "mock_error"}},
+                status_code=config.error_status,
+                headers={"retry-after": "1"} if config.error_status == 429 else None,
+            )
+
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        text = _completion_text(config.completion_tokens)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += config.completion_tokens
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        common = {"id": completion_id, "created": int(time.time()), "model": body.get("model", "mock")}
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": config.completion_tokens,
+            "total_tokens": prompt_tokens + config.completion_tokens,
+        }
+        token_seconds = 1 / config.tokens_per_second
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.latency + config.completion_tokens * token_seconds)
+            return {
+                **common,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            }
+
+        async def chunks():
+            await asyncio.sleep(config.latency)
+            # Roughly one token per word
+            for word in text.split(" "):
+                chunk = {
+                    **common,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_seconds)
+            last = {
+                **common,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage},
+            }
+            yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Serve an ASGI app with uvicorn on a thread of the current process."""
+
+    def __init__(self, app, port: int = 0):
+        self.port = port or free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 30.0):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    defaults = MockLLMConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of failed calls")
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_arguments(args: argparse.Namespace) -> MockLLMConfig:
+    return MockLLMConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_arguments(args)), host="127.0.0.1", port=args.port)
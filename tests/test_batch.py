@@ -0,0 +1,48 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+import src.services.service_batch as service_batch
+from src.services.service_ratelimit import RateLimitExceeded
+from src.services.service_report import Report
+
+
+def test_colliding_group_names_get_distinct_zip_entries(monkeypatch):
+    async def agenerate_report(threat, threat_data):
+        return Report(content=f"%PDF-{threat}".encode())
+
+    monkeypatch.setattr(service_batch, "agenerate_report", agenerate_report)
+    groups = {name: (name, {}) for name in ("DoS/x", "DoS_x", "dos_x")}
+
+    archive = asyncio.run(service_batch.agenerate_group_reports(groups, "per_group"))
+
+    with zipfile.ZipFile(io.BytesIO(archive.read())) as bundle:
+        entries = {name: bundle.read(name) for name in bundle.namelist()}
+    assert entries == {
+        "DoS_x.pdf": b"%PDF-DoS/x",
+        "DoS_x_2.pdf": b"%PDF-DoS_x",
+        "dos_x_3.pdf": b"%PDF-dos_x",
+    }
+
+
+def test_failed_group_cancels_its_siblings(monkeypatch):
+    cancelled = []
+
+    async def agenerate_report(threat, threat_data):
+        if threat == "Exploits":
+            raise RateLimitExceeded("model", 30.0)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(threat)
+            raise
+
+    monkeypatch.setattr(service_batch, "agenerate_report", agenerate_report)
+    groups = {name: (name, {}) for name in ("Backdoor", "Exploits", "Fuzzers")}
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(asyncio.wait_for(service_batch.agenerate_group_reports(groups), 5))
+
+    assert sorted(cancelled) == ["Backdoor", "Fuzzers"]
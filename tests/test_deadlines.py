@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+import src.services.service_generator as service_generator
+from src.services.service_deadline import Deadline, RequestAbandoned
+from src.services.service_jobs import Job, JobQueue
+from src.services.service_metrics import metrics
+from src.services.service_state import MemoryStateBackend
+
+from test_single_flight import CountingTask, patch_pipeline
+
+
+class SlowTask(CountingTask):
+    def execute(self, context=None):
+        super().execute(context)
+        time.sleep(0.3)
+        return "## Report"
+
+
+def slow_create_tasks(agents, threat, threat_data):
+    return {
+        "analysis": (SlowTask(), []),
+        "mitigation": (SlowTask(), ["analysis"]),
+        "report": (SlowTask(), ["analysis", "mitigation"]),
+    }
+
+
+def abandoned_stages(stage, state):
+    return metrics.stages_abandoned._values.get((stage, state), 0.0)
+
+
+def test_deadline_cancels_stages_not_started(monkeypatch):
+    patch_pipeline(monkeypatch)
+    monkeypatch.setattr(service_generator, "create_tasks", slow_create_tasks)
+    before = {
+        (stage, state): abandoned_stages(stage, state)
+        for stage in ("analysis", "mitigation", "report", "pdf")
+        for state in ("not_started", "interrupted")
+    }
+    tokens_saved = metrics.llm_tokens_saved._values.get((), 0.0)
+
+    async def run():
+        with pytest.raises(RequestAbandoned) as abandoned:
+            await Deadline(0.1).run(service_generator.agenerate_report("Backdoor", {"sbytes": 300}))
+        # The running agent call finishes in its thread; nothing starts after it
+        await asyncio.sleep(0.5)
+        return abandoned.value.reason
+
+    assert asyncio.run(run()) == "deadline"
+    assert CountingTask.calls == 1
+    assert abandoned_stages("analysis", "interrupted") - before["analysis", "interrupted"] == 1
+    for stage in ("mitigation", "report", "pdf"):
+        assert abandoned_stages(stage, "not_started") - before[stage, "not_started"] == 1
+    assert metrics.llm_tokens_saved._values.get((), 0.0) > tokens_saved
+
+
+def test_disconnect_stops_the_event_stream(monkeypatch):
+    patch_pipeline(monkeypatch)
+    monkeypatch.setattr(service_generator, "create_tasks", slow_create_tasks)
+    polls = []
+
+    async def is_disconnected():
+        polls.append(None)
+        return len(polls) > 1
+
+    async def run():
+        events = []
+        deadline = Deadline(60, is_disconnected, poll_interval=0.05)
+        with pytest.raises(RequestAbandoned) as abandoned:
+            async for event, _ in deadline.iterate(service_generator.astream_report("Backdoor", {"sbytes": 300})):
+                events.append(event)
+        return events, abandoned.value.reason
+
+    assert asyncio.run(run()) == ([], "disconnected")
+    assert CountingTask.calls == 1
+
+
+def test_job_past_its_deadline_is_not_run(monkeypatch):
+    patch_pipeline(monkeypatch)
+    queue = JobQueue(maxsize=1, workers=1, result_ttl=60, backend=MemoryStateBackend())
+    job = Job("Backdoor", {"sbytes": 300}, deadline_seconds=0.01)
+    time.sleep(0.02)
+
+    asyncio.run(queue._run(job))
+
+    assert (job.status, job.error) == ("failed", "Deadline exceeded")
+    assert CountingTask.calls == 0
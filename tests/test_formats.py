@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import src.services.service_generator as service_generator
+from src.services.service_formats import negotiate_format, parse_report_sections
+
+from test_single_flight import CountingTask, patch_pipeline
+
+REPORT = """# Incident Report: Backdoor
+
+## 1. Executive Summary
+A backdoor was found.
+
+## 2. Threat Analysis
+### Indicators
+Impact: high on integrity
+
+**3. Impact Assessment:** Confidentiality is at risk.
+
+4) Mitigation Strategy
+- Isolate the host
+
+Conclusions:
+Contained.
+"""
+
+
+def test_negotiate_format():
+    assert negotiate_format(None) == "pdf"
+    assert negotiate_format("*/*") == "pdf"
+    assert negotiate_format("text/html;q=0.2, application/json;q=0.9") == "json"
+    assert negotiate_format("application/json", requested="markdown") == "markdown"
+    assert negotiate_format("image/png") is None
+
+
+def test_negotiate_format_wildcards_and_quality():
+    assert negotiate_format("text/*") == "html"
+    assert negotiate_format("application/*") == "pdf"
+    assert negotiate_format("application/*, application/pdf;q=0") == "json"
+    assert negotiate_format("text/*;q=0.5, text/markdown") == "markdown"
+    assert negotiate_format("*/*;q=0.1, text/html") == "html"
+    assert negotiate_format("application/pdf;q=5") is None
+    assert negotiate_format("application/pdf;q=-1, text/html;q=0.3") == "html"
+
+
+def test_parse_report_sections():
+    assert parse_report_sections(REPORT) == {
+        "executive_summary": "A backdoor was found.",
+        "threat_analysis": "### Indicators\nImpact: high on integrity",
+        "impact_assessment": "Confidentiality is at risk.",
+        "mitigation_strategy": "- Isolate the host",
+        "conclusions": "Contained.",
+    }
+
+
+def test_cheap_formats_skip_html_and_pdf(monkeypatch):
+    patch_pipeline(monkeypatch)
+
+    async def no_pdf_backend():
+        raise AssertionError("the PDF backend is not needed")
+
+    def no_html(*args):
+        raise AssertionError("the HTML page is not needed")
+
+    monkeypatch.setattr(service_generator, "astarted_pdf_backend", no_pdf_backend)
+
+    async def run():
+        markdown = await service_generator.agenerate_report("Backdoor", {"sbytes": 200}, output_format="markdown")
+        monkeypatch.setattr(service_generator, "render_html_report", no_html)
+        structured = await service_generator.agenerate_report("Backdoor", {"sbytes": 200}, output_format="json")
+        return markdown, structured
+
+    markdown, structured = asyncio.run(run())
+
+    assert (markdown.media_type, markdown.read()) == ("text/markdown", b"## Report")
+    assert json.loads(structured.read())["markdown"] == "## Report"
+    assert CountingTask.calls == 6
@@ -0,0 +1,98 @@
+import io
+import json
+
+import pytest
+
+from src.services.service_ingest import detect_format, triage_flows
+
+COLUMNS = ["id", "dur", "proto", "service", "state", "sbytes", "rate", "sload", "attack_cat", "label"]
+ROWS = (
+    [[i, 0.1, "tcp", "http", "FIN", 1000, 50, 20000, "Normal", 0] for i in range(20)]
+    + [[100 + i, 0.00001, "udp", "dns", "INT", 114, 100000 + i, 40000000, "Generic", 1] for i in range(5)]
+    + [[200 + i, 1.0, "tcp", "-", "FIN", 2000, 60, 25000, "Exploits", 1] for i in range(5)]
+    + [[300, 0.5, "tcp", "-", "REQ", 5000000, 1, 300000000, "", 1]]
+)
+
+
+def csv_file() -> io.BytesIO:
+    lines = [",".join(COLUMNS)] + [",".join(map(str, row)) for row in ROWS]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def ndjson_file() -> io.BytesIO:
+    return io.BytesIO("\n".join(json.dumps(dict(zip(COLUMNS, row))) for row in ROWS).encode())
+
+
+def test_triage_ranks_clusters_and_skips_normal_flows():
+    result = triage_flows(csv_file(), "csv", top_k=2, default_threat="Unknown", chunk_rows=1000)
+
+    assert (result.rows, result.benign, result.cluster_count) == (31, 20, 3)
+    assert [cluster.name for cluster in result.clusters] == ["Unknown tcp REQ", "Generic udp dns INT"]
+    generic = result.clusters[1].threat_data
+    assert generic["flow_count"] == 5
+    assert generic["rate"] == {"min": 100000.0, "max": 100004.0, "mean": 100002.0}
+
+
+def test_triage_does_not_depend_on_chunking_or_format():
+    whole = triage_flows(csv_file(), "csv", top_k=3, chunk_rows=1000).to_dict()
+    chunked = triage_flows(csv_file(), "csv", top_k=3, chunk_rows=4).to_dict()
+    ndjson = triage_flows(ndjson_file(), "ndjson", top_k=3, chunk_rows=7).to_dict()
+    for result in (whole, chunked, ndjson):
+        result.pop("seconds")
+
+    assert chunked == whole
+    assert ndjson == whole
+
+
+def test_triage_caps_tracked_clusters():
+    result = triage_flows(csv_file(), "csv", top_k=5, chunk_rows=4, max_clusters=2)
+
+    assert result.cluster_count == 2
+    assert result.dropped_flows == 5
+    assert detect_format("flows.csv", None) == "csv"
+    assert detect_format("upload", "application/x-ndjson") == "ndjson"
+
+
+def test_triage_without_numeric_columns():
+    upload = io.BytesIO(b"proto,state,attack_cat\ntcp,INT,Exploits\nudp,REQ,Generic\ntcp,INT,Exploits\n")
+
+    result = triage_flows(upload, "csv", top_k=3, chunk_rows=2)
+
+    assert [(cluster.name, cluster.threat_data) for cluster in result.clusters] == [
+        ("Exploits tcp INT", {"flow_count": 2, "proto": "tcp", "state": "INT"}),
+        ("Generic udp REQ", {"flow_count": 1, "proto": "udp", "state": "REQ"}),
+    ]
+
+
+def test_stray_string_does_not_depend_on_chunking():
+    rows = [row[:] for row in ROWS]
+    rows[22][6] = "n/a"
+    lines = [",".join(COLUMNS)] + [",".join(map(str, row)) for row in rows]
+    upload = "\n".join(lines).encode()
+
+    whole = triage_flows(io.BytesIO(upload), "csv", top_k=3, chunk_rows=1000).to_dict()
+    chunked = triage_flows(io.BytesIO(upload), "csv", top_k=3, chunk_rows=4).to_dict()
+    for result in (whole, chunked):
+        result.pop("seconds")
+
+    assert chunked == whole
+    generic = next(cluster for cluster in whole["top"] if cluster["threat"] == "Generic")
+    # The unparsable value is skipped, the other four rates are kept
+    assert generic["threat_data"]["rate"] == {"min": 100000.0, "max": 100004.0, "mean": 100002.0}
+
+
+def test_ndjson_lines_must_be_objects():
+    with pytest.raises(ValueError):
+        triage_flows(io.BytesIO(b"[1,2]\n3\n"), "ndjson", top_k=3)
+
+
+def test_unparsable_indicators_add_nothing_and_unscored_clusters_are_dropped():
+    upload = io.BytesIO(
+        b"rate,state,attack_cat\nabc,FIN,Junk\n5,FIN,Exploits\n,INT,Generic\n50,FIN,Quiet\n"
+    )
+
+    result = triage_flows(upload, "csv", top_k=5)
+
+    assert [(cluster.threat, round(cluster.max_score, 3)) for cluster in result.clusters] == [
+        ("Generic", 1.0), ("Exploits", 0.929),
+    ]
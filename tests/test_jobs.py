@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import src.routers.router_generator as router_generator
+from src.services.service_jobs import Job, JobQueue
+from src.services.service_report import Report
+from src.services.service_state import MemoryStateBackend
+
+
+def test_results_past_the_memory_cap_are_spilled(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.service_report.settings.REPORT_SPILL_DIR", str(tmp_path))
+    queue = JobQueue(maxsize=1, workers=1, result_ttl=60, backend=MemoryStateBackend(), memory_bytes=10)
+
+    async def run():
+        return [await queue.add_completed("Backdoor", {}, Report(content=b"%PDF-1234")) for _ in range(3)]
+
+    first, second, third = asyncio.run(run())
+
+    assert first.result.content == b"%PDF-1234"
+    assert second.result.temporary and third.result.temporary
+    assert second.result.read() == b"%PDF-1234"
+    assert queue._retained_bytes == 9
+
+
+def test_expired_results_are_pruned_without_new_submissions():
+    queue = JobQueue(maxsize=1, workers=1, result_ttl=0, backend=MemoryStateBackend(), prune_interval=0.01)
+
+    async def run():
+        await queue.start()
+        job = await queue.add_completed("Backdoor", {}, Report(content=b"%PDF-"))
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return await queue.get(job.id)
+
+    assert asyncio.run(run()) is None
+    assert queue._retained_bytes == 0
+
+
+def test_pdf_of_a_failed_job_is_a_conflict(monkeypatch):
+    queue = JobQueue(maxsize=1, workers=1, result_ttl=60, backend=MemoryStateBackend())
+    job = Job("Backdoor", {})
+    job.status, job.error = "failed", "LLM provider is at capacity, retry after 30s"
+    queue._jobs[job.id] = job
+    monkeypatch.setattr(router_generator, "job_queue", queue)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(router_generator.get_report_job_pdf(job.id))
+
+    assert excinfo.value.status_code == 409
+    assert excinfo.value.detail == {"status": "failed", "error": job.error}
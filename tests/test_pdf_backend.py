@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import src.services.service_generator as service_generator
+import src.services.service_pdf as service_pdf
+from src.services.service_crewai.utils import render_html_report
+from src.services.service_pdf import FpdfBackend, PooledWeasyPrintBackend, _deny_url_fetcher
+
+
+class FakePool:
+    """Stands in for the process pool; a broken one fails every render."""
+
+    def __init__(self, broken: bool):
+        self.broken = broken
+        self.shut_down = False
+
+    def submit(self, func, *args):
+        future = Future()
+        if self.broken or self.shut_down:
+            future.set_exception(BrokenProcessPool("a worker died"))
+        else:
+            future.set_result(b"%PDF-")
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class FlakyPoolBackend(PooledWeasyPrintBackend):
+    def __init__(self):
+        super().__init__(workers=1)
+        self.pools = []
+
+    def start(self):
+        # The first pool breaks, the ones after it work
+        self._pool = FakePool(broken=not self.pools)
+        self.pools.append(self._pool)
+
+
+def test_broken_pool_is_restarted_once():
+    backend = FlakyPoolBackend()
+
+    async def run():
+        return await asyncio.gather(*[backend.arender("<p>report</p>", "report") for _ in range(10)])
+
+    assert asyncio.run(run()) == [b"%PDF-"] * 10
+    assert len(backend.pools) == 2
+    assert backend.pools[0].shut_down and not backend.pools[1].shut_down
+
+
+class UnstartableBackend(PooledWeasyPrintBackend):
+    def start(self):
+        raise OSError("cannot load library 'libpango-1.0-0'")
+
+
+def test_pdf_report_key_names_the_fallback_backend(monkeypatch):
+    def key(backend, started):
+        monkeypatch.setattr(service_pdf, "_pdf_backend", backend)
+        monkeypatch.setattr(service_pdf, "_pdf_backend_started", started)
+        return asyncio.run(service_generator._areport_key("Backdoor", {"sbytes": 200}, "template", "pdf"))
+
+    fallen_back = key(UnstartableBackend(workers=1), started=False)
+
+    assert isinstance(service_pdf._pdf_backend, FpdfBackend)
+    assert fallen_back == key(FpdfBackend(), started=True)
+    assert fallen_back != key(UnstartableBackend(workers=1), started=True)
+
+
+def test_report_html_cannot_reach_local_files():
+    html = render_html_report('<img src="file:///etc/passwd"> **bold**', "Backdoor")
+
+    assert '<img src="file:///etc/passwd">' not in html
+    assert "<strong>bold</strong>" in html
+    with pytest.raises(ValueError):
+        _deny_url_fetcher("file:///etc/passwd")
+    with pytest.raises(ValueError):
+        _deny_url_fetcher("http://169.254.169.254/latest/meta-data/")
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+import src.services.service_generator as service_generator
+from src.services.service_ratelimit import RATE_LIMIT_NAMESPACE, ModelLimiter, RateLimitExceeded, llm_scheduler
+from src.services.service_state import MemoryStateBackend
+
+from test_single_flight import CountingTask, patch_pipeline
+
+
+def test_pipeline_over_budget_is_rejected_before_its_first_call(monkeypatch):
+    patch_pipeline(monkeypatch)
+    model = service_generator.settings.MODEL
+    # Two requests per minute: the third stage of the report could not start
+    monkeypatch.setitem(llm_scheduler._limiters, model, ModelLimiter(model, 2, 100000, MemoryStateBackend()))
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(service_generator.agenerate_report("Backdoor", {"sbytes": 400}))
+
+    assert CountingTask.calls == 0
+
+
+def test_cancelled_wait_releases_its_reservation():
+    backend = MemoryStateBackend()
+    limiter = ModelLimiter("model", rpm=1, tpm=10000, backend=backend)
+
+    async def run():
+        await limiter.acquire(100, max_wait=120)
+        waiting = asyncio.ensure_future(limiter.acquire(100, max_wait=120))
+        await asyncio.sleep(0.05)
+        assert len(backend.get(RATE_LIMIT_NAMESPACE, "model")) == 2
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert len(backend.get(RATE_LIMIT_NAMESPACE, "model")) == 1
+
+
+def test_limits_must_be_positive():
+    with pytest.raises(ValueError):
+        ModelLimiter("model", rpm=0, tpm=10000, backend=MemoryStateBackend())
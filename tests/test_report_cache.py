@@ -0,0 +1,75 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import src.services.service_crewai.utils as utils
+import src.services.service_generator as service_generator
+from src.services.service_cache import ReportCache
+
+
+def make_cache(directory, **limits):
+    options = dict(memory_entries=2, memory_bytes=1024, max_bytes=1024, ttl_seconds=60)
+    options.update(limits)
+    return ReportCache(str(directory), **options)
+
+
+def test_hot_keys_are_served_from_memory(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", b"%PDF-a")
+    os.remove(tmp_path / "a.pdf")
+
+    report = asyncio.run(cache.aget("a"))
+
+    assert report.read() == b"%PDF-a"
+    assert cache.stats()["hits_memory"] == 1
+
+
+def test_put_evicts_from_the_index_without_rescanning(tmp_path, monkeypatch):
+    (tmp_path / "old.pdf").write_bytes(b"x" * 600)
+    cache = make_cache(tmp_path)
+    assert cache.get("missing") is None
+
+    def scandir(path):
+        raise AssertionError("put rescanned the cache directory")
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    cache.put("new", b"y" * 600)
+
+    assert sorted(os.listdir(tmp_path)) == ["new.pdf"]
+    assert cache.stats()["disk_bytes"] == 600
+
+
+def test_creating_a_cache_does_no_io(tmp_path):
+    make_cache(tmp_path / "reports")
+
+    assert not (tmp_path / "reports").exists()
+
+
+def test_files_of_other_workers_are_found_on_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    make_cache(tmp_path).put("shared", b"%PDF-shared")
+
+    report = asyncio.run(cache.aget("shared"))
+
+    assert report.read() == b"%PDF-shared"
+    assert cache.stats()["hits_disk"] == 1
+    assert asyncio.run(cache.aget("missing")) is None
+
+
+def test_report_key_follows_the_template_and_prompt_settings(tmp_path, monkeypatch):
+    template = tmp_path / "report.html"
+    template.write_text("<main>{{ body }}</main>")
+    monkeypatch.setattr(utils, "load_report_template", lambda: SimpleNamespace(filename=str(template)))
+    monkeypatch.setattr(service_generator.settings, "PROMPT_COMPACTION_ENABLED", True)
+
+    def key():
+        utils.html_renderer_digest.cache_clear()
+        return asyncio.run(service_generator._areport_key("Backdoor", {"sbytes": 200}, "template", "html"))
+
+    original = key()
+    template.write_text("<main class='dark'>{{ body }}</main>")
+    restyled = key()
+    monkeypatch.setattr(service_generator.settings, "PROMPT_TOP_DEVIATIONS", 5)
+
+    assert len({original, restyled, key()}) == 3
+    utils.html_renderer_digest.cache_clear()
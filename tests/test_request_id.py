@@ -0,0 +1,35 @@
+import asyncio
+
+from src.logger.logger import request_id_var
+from src.services.service_metrics import RequestIdMiddleware
+
+
+def serve(headers):
+    seen = []
+    sent = []
+
+    async def app(scope, receive, send):
+        seen.append(request_id_var.get())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    asyncio.run(RequestIdMiddleware(app)(scope, None, send))
+    return seen[0], dict(sent[0]["headers"])
+
+
+def test_request_id_is_generated_by_the_server():
+    request_id, headers = serve([(b"x-request-id", b"someone-elses-id")])
+
+    assert request_id != "someone-elses-id"
+    assert headers[b"x-request-id"] == request_id.encode()
+    assert headers[b"x-client-request-id"] == b"someone-elses-id"
+
+
+def test_malformed_client_request_id_is_not_echoed():
+    request_id, headers = serve([(b"x-request-id", b"../../runs\r\nx")])
+
+    assert b"x-client-request-id" not in headers
+    assert serve([])[0] != request_id
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import src.services.service_generator as service_generator
+from src.services.service_pdf import PdfBackend
+from src.services.service_ratelimit import ModelLimiter, llm_scheduler
+from src.services.service_state import MemoryStateBackend
+from src.services.service_singleflight import SingleFlight, report_flights
+
+
+class FakeAgent:
+    backstory = ""
+
+
+class CountingTask:
+    """Stands in for a CrewAI task; counts the LLM calls it would make."""
+
+    calls = 0
+    lock = threading.Lock()
+    description = "Analyze the detected threat"
+    expected_output = "A report"
+    agent = FakeAgent()
+
+    def execute(self, context=None):
+        with CountingTask.lock:
+            CountingTask.calls += 1
+        time.sleep(0.05)
+        return "## Report"
+
+
+def fake_create_tasks(agents, threat, threat_data):
+    return {
+        "analysis": (CountingTask(), []),
+        "mitigation": (CountingTask(), ["analysis"]),
+        "report": (CountingTask(), ["analysis", "mitigation"]),
+    }
+
+
+class FakePdfBackend(PdfBackend):
+    def render(self, html_text, md_text):
+        return b"%PDF-"
+
+
+async def fake_started_pdf_backend():
+    return FakePdfBackend()
+
+
+class FakeAgents:
+    async def __aenter__(self):
+        return {}
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeResources:
+    def agents(self, model):
+        return FakeAgents()
+
+
+def patch_pipeline(monkeypatch):
+    CountingTask.calls = 0
+    monkeypatch.setattr(service_generator, "create_tasks", fake_create_tasks)
+    monkeypatch.setattr(service_generator, "astarted_pdf_backend", fake_started_pdf_backend)
+    monkeypatch.setattr(service_generator, "resources", FakeResources())
+    monkeypatch.setattr(service_generator.settings, "REPORT_CACHE_ENABLED", False)
+    monkeypatch.setattr(service_generator.settings, "STAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(service_generator.settings, "HTML_RENDERER", "template")
+    # A fresh budget per test: admissions of earlier tests must not shed this one
+    model = service_generator.settings.MODEL
+    monkeypatch.setitem(llm_scheduler._limiters, model, ModelLimiter(model, 1000, 10 ** 7, MemoryStateBackend()))
+
+
+def test_identical_concurrent_requests_share_one_generation(monkeypatch):
+    patch_pipeline(monkeypatch)
+    leaders, coalesced = report_flights.leaders, report_flights.coalesced
+
+    async def run():
+        return await asyncio.gather(*[
+            service_generator.agenerate_report("Backdoor", {"sbytes": 200, "proto": "ddp"})
+            for _ in range(50)
+        ])
+
+    reports = asyncio.run(run())
+
+    assert all(report is not None and report.read() == b"%PDF-" for report in reports)
+    # One task graph of three LLM calls, not fifty
+    assert CountingTask.calls == 3
+    assert report_flights.leaders - leaders == 1
+    assert report_flights.coalesced - coalesced == 49
+
+
+def test_different_requests_are_not_coalesced(monkeypatch):
+    patch_pipeline(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(
+            service_generator.agenerate_report("Backdoor", {"sbytes": 200}),
+            service_generator.agenerate_report("Backdoor", {"sbytes": 300}),
+        )
+
+    asyncio.run(run())
+
+    assert CountingTask.calls == 6
+
+
+def test_shared_call_survives_one_cancelled_waiter():
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("key", slow))
+        second = asyncio.ensure_future(flights.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == ("done", True)
+    assert flights.stats() == {"leaders": 1, "coalesced": 1, "in_flight": 0}
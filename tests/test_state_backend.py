@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+import pytest
+
+from src.services.service_artifacts import StageRuns
+from src.services.service_jobs import JobQueue
+from src.services.service_metrics import METRICS_NAMESPACE, Metrics, arender_metrics, metrics
+from src.services.service_ratelimit import ModelLimiter, RateLimitExceeded
+from src.services.service_report import Report
+from src.services.service_state import MemoryStateBackend, SQLiteStateBackend
+
+
+def test_sqlite_backend_update_and_expiry(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / "state.sqlite3"))
+    assert backend.update("counters", "a", lambda value: ((value or 0) + 1, value)) is None
+    assert backend.update("counters", "a", lambda value: ((value or 0) + 1, value)) == 1
+    backend.set("jobs", "expired", {"status": "queued"}, ttl=-1)
+    assert backend.get("jobs", "expired") is None
+    assert MemoryStateBackend().get("jobs", "missing") is None
+
+
+def test_rate_limit_budget_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    # Two workers: same database file, separate connections and limiters
+    first = ModelLimiter("model", rpm=2, tpm=10000, backend=SQLiteStateBackend(path))
+    second = ModelLimiter("model", rpm=2, tpm=10000, backend=SQLiteStateBackend(path))
+
+    async def run():
+        await first.acquire(100, max_wait=0)
+        await second.acquire(100, max_wait=0)
+        with pytest.raises(RateLimitExceeded):
+            await first.acquire(100, max_wait=0)
+
+    asyncio.run(run())
+
+
+def test_every_report_of_a_request_keeps_its_run(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    owner = StageRuns(max_entries=10, backend=SQLiteStateBackend(path), ttl=60)
+    other = StageRuns(max_entries=10, backend=SQLiteStateBackend(path), ttl=60)
+
+    async def run():
+        await owner.record("request", "dos", {"threat": "DoS", "stages": {}})
+        await owner.record("request", "exploits", {"threat": "Exploits", "stages": {}})
+        return await owner.get("request"), await other.get("request"), await other.get("unknown")
+
+    own, seen, unknown = asyncio.run(run())
+    assert own == seen
+    assert [(run["report_key"], run["threat"]) for run in seen] == [("dos", "DoS"), ("exploits", "Exploits")]
+    assert unknown is None
+
+
+def test_job_is_visible_from_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.service_report.settings.REPORT_SPILL_DIR", str(tmp_path / "spill"))
+    path = str(tmp_path / "state.sqlite3")
+    owner = JobQueue(maxsize=1, workers=1, result_ttl=60, backend=SQLiteStateBackend(path))
+    other = JobQueue(maxsize=1, workers=1, result_ttl=60, backend=SQLiteStateBackend(path))
+
+    async def run():
+        job = await owner.add_completed("Backdoor", {}, Report(content=b"%PDF-"))
+        return await other.get(job.id), await other.get("unknown")
+
+    seen, unknown = asyncio.run(run())
+    assert seen.status == "succeeded"
+    # The in-memory result was spilled so the other worker can serve it
+    assert seen.result.read() == b"%PDF-"
+    assert unknown is None
+
+
+def test_metrics_are_summed_over_workers(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / "state.sqlite3"))
+    other = Metrics()
+    other.cache_lookups.inc(2, result="hit")
+    other.stage_seconds.observe(0.2, stage="other", status="ok")
+    backend.set(METRICS_NAMESPACE, "other-worker", other.snapshot())
+    metrics.cache_lookups.inc(result="hit")
+    own = metrics.cache_lookups._values[("hit",)]
+
+    lines = asyncio.run(arender_metrics(backend)).splitlines()
+
+    assert f'report_cache_lookups_total{{result="hit"}} {own + 2}' in lines
+    assert 'report_stage_duration_seconds_count{stage="other",status="ok"} 1' in lines
+    # This worker published its own metrics while answering
+    assert str(os.getpid()) in backend.items(METRICS_NAMESPACE)